@@ -6,7 +6,12 @@ from .cohomology_arithmetic import (
     get_overconvergent_class_matrices,
     get_overconvergent_class_quaternionic,
 )
-from .integrals import double_integral_zero_infty, integrate_H1
+from .integrals import (
+    double_integral_many,
+    double_integral_scheduled,
+    double_integral_zero_infty,
+    integrate_H1,
+)
 from .limits import find_optimal_embeddings, find_tau0_and_gtau, num_evals
 from .sarithgroup import BigArithGroup_class
 from .util import (
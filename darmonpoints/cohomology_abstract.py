@@ -155,6 +155,128 @@ class CohomologyElement(ModuleElement):
         else:
             return self._evaluate_word_tietze(wd, left_act_by=left_act_by)
 
+    def evaluate_many(self, xlist, left_act_by=None):
+        r"""
+        Return the list of the values ``self.evaluate(x, left_act_by)`` for
+        ``x`` in ``xlist``.
+
+        The argument ``left_act_by`` can be either a single element, which
+        acts on all the values, or a list with one element for each ``x``.
+
+        The words of the ``x`` are inserted in a prefix trie, and the partial
+        value and the running product at each shared prefix are only computed
+        once. When the coefficient module has acting matrices, the running
+        products are the acting matrices of the prefixes (reduced modulo `p^M`
+        when possible, see :attr:`CohomologyGroup._local_reduction`) and the
+        partial values are vectors of moments.
+
+        TESTS::
+
+            sage: from darmonpoints.sarithgroup import BigArithGroup
+            sage: from darmonpoints.cohomology_arithmetic import ArithCohOverconvergent
+            sage: G = BigArithGroup(11, 1, 1, use_shapiro=False, outfile='/dev/null')
+            sage: HOC = ArithCohOverconvergent(G, base=Zp(11, 4))
+            sage: V = HOC.coefficient_module()
+            sage: ngens = len(HOC.group().gens())
+            sage: Phi0 = HOC([V([j + k for k in range(V.dimension())]) for j in range(ngens)])
+            sage: xlist = [g * h**-1 for g in HOC.group().gens() for h in HOC.group().gens()]
+            sage: Phi0.evaluate_many(xlist) == [Phi0.evaluate(x) for x in xlist]
+            True
+        """
+        G = self.parent().group()
+        words = [(x if x.parent() is G else G(x)).word_rep for x in xlist]
+        if isinstance(left_act_by, (list, tuple)):
+            actlist = left_act_by
+        else:
+            actlist = [left_act_by for _ in words]
+        if self.parent()._trivial_action:
+            return [
+                self._evaluate_word_tietze(wd, left_act_by=g)
+                for wd, g in zip(words, actlist)
+            ]
+        if self.parent()._acting_matrix is not None:
+            return self._evaluate_words_tietze_trie_local(words, actlist)
+        ans = self._evaluate_words_tietze_trie(words)
+        return [v if g is None else g * v for v, g in zip(ans, actlist)]
+
+    @staticmethod
+    def _word_trie(words):
+        # Each node of the trie is a pair (children, indices of words ending there)
+        root = ({}, [])
+        for n, word in enumerate(words):
+            node = root
+            for g in word:
+                node = node[0].setdefault(g, ({}, []))
+            node[1].append(n)
+        return root
+
+    def _evaluate_words_tietze_trie_local(self, words, actlist):
+        HH = self.parent()
+        V = HH.coefficient_module()
+        red = HH._local_reduction
+        if hasattr(self._val[0], "_moments"):
+            vals = [v._moments.lift() for v in self._val]
+        elif hasattr(self._val[0], "_vector_"):
+            vals = [v._vector_() for v in self._val]
+        else:
+            vals = list(self._val)
+        root = self._word_trie(words)
+        zero = 0 * vals[0]
+        ans = [zero for _ in words]
+        # The running matrix gamma is None at the root, meaning the identity
+        stack = [(child, g, zero, None) for g, child in root[0].items()]
+        while len(stack) > 0:
+            node, g, val, gamma = stack.pop()
+            if g > 0:
+                v = vals[g - 1]
+                val = val + (v if gamma is None else gamma * v)
+                A = HH._local_gen(g - 1, 1)
+            else:
+                A = HH._local_gen(-g - 1, -1)
+            gamma = A if gamma is None else gamma * A
+            if red is not None:
+                gamma = red(gamma)
+            if g < 0:
+                val = val - gamma * vals[-g - 1]
+            for n in node[1]:
+                ans[n] = val
+            stack.extend((child, h, val, gamma) for h, child in node[0].items())
+        return [
+            V(v if g is None else HH.generator_acting_matrix(g) * v)
+            for v, g in zip(ans, actlist)
+        ]
+
+    def _evaluate_words_tietze_trie(self, words):
+        G = self.parent().group()
+        V = self.parent().coefficient_module()
+        root = self._word_trie(words)
+        gens = G.gens()
+        gens_inv = {}
+        zero = V(0)
+        ans = [None for _ in words]
+        for n in root[1]:
+            ans[n] = zero
+        # The running product gamma is None at the root, meaning the identity
+        stack = [(child, g, zero, None) for g, child in root[0].items()]
+        while len(stack) > 0:
+            node, g, val, gamma = stack.pop()
+            if g > 0:
+                v = self._val[g - 1]
+                val = val + (v if gamma is None else gamma * v)
+                gamma = gens[g - 1] if gamma is None else gamma * gens[g - 1]
+            else:
+                g0 = -g - 1
+                try:
+                    ginv = gens_inv[g0]
+                except KeyError:
+                    ginv = gens_inv[g0] = gens[g0] ** -1
+                gamma = ginv if gamma is None else gamma * ginv
+                val = val - gamma * self._val[g0]
+            for n in node[1]:
+                ans[n] = val
+            stack.extend((child, h, val, gamma) for h, child in node[0].items())
+        return ans
+
     def check_cocycle_property(self, g1=None, g2=None, function=None):
         H = self.parent()
         G = H.group()
@@ -218,16 +340,17 @@ class CohomologyElement(ModuleElement):
             MS = MatrixSpace(R, dim, dim)
         else:
             MS = lambda x: x
-        fgrad = HH.fox_gradient(tuple(word))
+        fgrad = HH.fox_gradient_matrices(tuple(word))
+        if left_act_by is not None:
+            g0 = HH.generator_acting_matrix(left_act_by)
+            fgrad = [g0 * A for A in fgrad]
         if hasattr(self._val[0], "_moments"):
             ff = lambda v: v._moments.lift()
         elif hasattr(self._val[0], "_vector_"):
             ff = lambda v: v._vector_()
         else:
             ff = lambda v: v
-        ans = sum(
-            HH.GA_to_local(A, left_act_by) * ff(val) for A, val in zip(fgrad, self._val)
-        )
+        ans = sum(A * ff(val) for A, val in zip(fgrad, self._val))
         return V(ans)
 
     def _evaluate_word_tietze_identity(self, word, left_act_by=None):
@@ -280,6 +403,9 @@ class CohomologyGroup(Module):
         self._gen_pows = []
         self._gen_pows_neg = []
         self._trivial_action = kwargs.get("trivial_action", False)
+        self._space_algorithm = kwargs.get(
+            "space_algorithm", self.default_space_algorithm
+        )
         if action_map is None:
             if hasattr(V, "dimension"):
                 self._acting_matrix = lambda x, y: matrix(
@@ -336,11 +462,31 @@ class CohomologyGroup(Module):
     def coefficient_module(self):
         return self._coeffmodule
 
+    # Linear algebra used by space (see set_space_algorithm)
+    default_space_algorithm = "default"
+
+    def set_space_algorithm(self, algorithm):
+        r"""
+        Choose how :meth:`space` computes the kernel of the cocycle
+        conditions. See :func:`darmonpoints.util.sparse_right_kernel_matrix`
+        for the possible values of ``algorithm``.
+        """
+        if algorithm not in ("default", "dense", "sparse", "modular"):
+            raise ValueError(
+                "algorithm (= %s) should be 'default', 'dense', 'sparse' or 'modular'"
+                % algorithm
+            )
+        self._space_algorithm = algorithm
+        self.space.clear_cache()
+
     @cached_method
     def space(self):
         r"""
         Calculates the space of cocyles modulo coboundaries, as a Z-module.
 
+        The cocycle conditions are assembled as a sparse matrix, whose kernel
+        is computed as chosen by :meth:`set_space_algorithm`.
+
         TESTS:
 
         sage: from darmonpoints.sarithgroup import *
@@ -360,21 +506,24 @@ class CohomologyGroup(Module):
         gens = G.gens()
         ambient = R ** (Vdim * len(gens))
         # Now find the subspace of cocycles
-        A = Matrix(R, Vdim * len(gens), 0)
-        for nr, r in enumerate(G.get_relation_words()):
+        entries = {}
+        relation_words = G.get_relation_words()
+        for nr, r in enumerate(relation_words):
             set_verbose(verb)
             verbose("Processing relation word %s" % nr)
             set_verbose(0)
-            Alist = [
-                MatrixSpace(R, Vdim, Vdim)(self.GA_to_local(o))
-                for o in self.fox_gradient(tuple(r))
-            ]
-            newA = block_matrix(Alist, nrows=1)
-            A = A.augment(newA.transpose())
-        A = A.transpose()
-        cocycles = ambient.submodule(
-            [ambient(o) for o in A.right_kernel_matrix().rows()]
+            for i, o in enumerate(self.fox_gradient_matrices(tuple(r))):
+                o = MatrixSpace(R, Vdim, Vdim)(o)
+                for (a, b), x in o.dict().items():
+                    entries[(nr * Vdim + a, i * Vdim + b)] = x
+        K = sparse_right_kernel_matrix(
+            R,
+            Vdim * len(relation_words),
+            Vdim * len(gens),
+            entries,
+            algorithm=self._space_algorithm,
         )
+        cocycles = ambient.submodule([ambient(o) for o in K.rows()])
         gmat = block_matrix(
             [self._acting_matrix(g, Vdim) - 1 for g in G.gens()], nrows=len(G.gens())
         )
@@ -433,8 +582,6 @@ class CohomologyGroup(Module):
 
     @cached_method
     def fox_gradient(self, word, red=None):
-        if red is None:
-            red = lambda x: x
         V = self.coefficient_module()
         h = self.get_gen_pow(0, 0, red)
         ans = [self._gen_pows[0][0].parent()(0) for o in self.group().gens()]
@@ -445,49 +592,165 @@ class CohomologyGroup(Module):
         for j in range(lenword):
             i, a = word[j]
             ans[i] += h * self.get_fox_term(i, a, red)
-            ans[i] = red(ans[i])
+            if red is not None:
+                ans[i] = red(ans[i])
             if j < lenword - 1:
-                h = red(h * self.get_gen_pow(i, a, red))
+                h = h * self.get_gen_pow(i, a, red)
+                if red is not None:
+                    h = red(h)
+        return ans
+
+    @lazy_attribute
+    def _local_power_cache(self):
+        return LRUCache(self.default_power_cache_size)
+
+    @lazy_attribute
+    def _local_one(self):
+        return self.GA_to_local(self._gen_pows[0][0])
+
+    @lazy_attribute
+    def _local_reduction(self):
+        r"""
+        The map reducing the integer acting matrices modulo `p^M`, when the
+        coefficient module is a module of distributions of modulus `p^M` (and
+        None otherwise), so that their products do not grow.
+        """
+        try:
+            R = Zmod(self.coefficient_module()._pN)
+        except AttributeError:
+            return None
+        return lambda A: A.change_ring(R).lift()
+
+    def _local_gen(self, i, sign):
+        r"""
+        Return the matrix by which the ``i``-th generator (or its inverse, if
+        ``sign`` is negative) acts.
+        """
+        key = ("gen", i, sign)
+        try:
+            return self._local_power_cache[key]
+        except KeyError:
+            pass
+        genpows = self._gen_pows[i] if sign > 0 else self._gen_pows_neg[i]
+        ans = self.GA_to_local(genpows[1])
+        if self._local_reduction is not None:
+            ans = self._local_reduction(ans)
+        self._local_power_cache[key] = ans
         return ans
 
+    def local_gen_pow(self, i, a):
+        r"""
+        Return the matrix by which the ``a``-th power of the ``i``-th generator
+        acts.
+
+        It is computed from the matrix of the generator by repeated squaring,
+        reducing modulo `p^M` after each product (see :attr:`_local_reduction`),
+        and the matrices are kept in a bounded cache (see
+        :meth:`set_power_cache_size`).
+        """
+        if a == 0:
+            return self._local_one
+        sign = 1 if a > 0 else -1
+        return cached_power(
+            self._local_power_cache,
+            (i, sign),
+            self._local_gen(i, sign),
+            sign * a,
+            self._local_one,
+            self._local_reduction,
+        )
+
+    def local_fox_term(self, i, a):
+        r"""
+        Return the matrix by which ``self.get_fox_term(i, a)`` acts.
+
+        It is computed from the matrix of the generator by the doubling formula
+        for geometric sums (see :func:`darmonpoints.util.cached_geometric_sum`),
+        reducing modulo `p^M` after each product, and the matrices are kept in a
+        bounded cache (see :meth:`set_power_cache_size`).
+        """
+        one = self._local_one
+        red = self._local_reduction
+        if a == 1:
+            return one
+        elif a > 1:
+            return cached_geometric_sum(
+                self._local_power_cache, (i, 1), self._local_gen(i, 1), a, one, red
+            )
+        A = self._local_gen(i, -1)
+        if a == -1:
+            ans = -A
+        else:
+            ans = -A * cached_geometric_sum(
+                self._local_power_cache, (i, -1), A, -a, one, red
+            )
+        return ans if red is None else red(ans)
+
+    @lazy_attribute
+    def _fox_program(self):
+        return FoxGradientProgram(
+            self.local_gen_pow, self.local_fox_term, red=self._local_reduction
+        )
+
+    def fox_gradient_matrices(self, word):
+        r"""
+        Return the list of the matrices by which the entries of
+        ``self.fox_gradient(word)`` act.
+
+        The gradient is computed directly with matrices, by a straight-line
+        program (see :class:`darmonpoints.util.FoxGradientProgram`) which shares
+        the products of common prefixes with the words seen before. Every
+        product is reduced modulo `p^M` when the coefficient module has such
+        a modulus (see :attr:`_local_reduction`).
+        """
+        one = self.local_gen_pow(0, 0)
+        return self._fox_program.gradient(
+            tietze_to_syllables(word), 0 * one, len(self.group().gens())
+        )
+
+    default_power_cache_size = 2**10
+
+    @lazy_attribute
+    def _power_cache(self):
+        return LRUCache(self.default_power_cache_size)
+
+    def set_power_cache_size(self, cache_size):
+        r"""
+        Change the number of powers and Fox terms of the generators (and of
+        their acting matrices) which are kept in the caches.
+        """
+        self._power_cache.set_maxsize(cache_size)
+        self._local_power_cache.set_maxsize(cache_size)
+
     def get_gen_pow(self, i, a, red=None):
-        if red is None:
-            red = lambda x: x
         if a == 0:
             return self._gen_pows[0][0]
         elif a > 0:
             genpows = self._gen_pows[i]
+            key = (i, 1)
         else:
             genpows = self._gen_pows_neg[i]
+            key = (i, -1)
             a = -a
-        while len(genpows) <= a:
-            tmp = genpows[1] * genpows[-1]
-            genpows.append(red(tmp))
-        return genpows[a]
+        return cached_power(self._power_cache, key, genpows[1], a, genpows[0], red)
 
     def get_fox_term(self, i, a, red=None):
-        if red is None:
-            red = lambda x: x
         if a == 1:
             return self._gen_pows[i][0]
         elif a == -1:
             return -self._gen_pows_neg[i][1]
         elif a > 1:
             genpows = self._gen_pows[i]
-            ans = genpows[0] + genpows[1]
-            for o in range(a - 2):
-                ans = red(ans)
-                ans = genpows[0] + genpows[1] * ans
-            return red(ans)
+            return cached_geometric_sum(
+                self._power_cache, (i, 1), genpows[1], a, genpows[0], red
+            )
         elif a < -1:
-            a = -a
             genpows = self._gen_pows_neg[i]
-            ans = genpows[0] + genpows[1]
-            for o in range(a - 2):
-                ans = red(ans)
-                ans = genpows[0] + genpows[1] * ans
+            ans = cached_geometric_sum(
+                self._power_cache, (i, -1), genpows[1], -a, genpows[0], red
+            )
             ans = -genpows[1] * ans
-            return red(ans)
+            return ans if red is None else red(ans)
 
     def eval_at_genpow(self, i, a, v, red=None):
         if red is None:
@@ -515,17 +778,61 @@ class CohomologyGroup(Module):
             ans = V(-genpows[1] * ans._val)
             return ans.reduce_mod()
 
-    @cached_method
-    def hecke_matrix(self, l, use_magma=True, g0=None):  # l can be oo
-        dim = self.dimension()
-        R = self.coefficient_module().base_ring()
-        M = matrix(R, dim, dim, 0)
-        for j, cocycle in enumerate(self.gens()):
-            # Construct column j of the matrix
-            verbose(
-                "Constructing column %s/%s of the hecke matrix for prime %s"
-                % (j, dim, l)
+    @cached_method(key=lambda self, l, use_magma, g0, ncpus: (l, use_magma, g0))
+    def hecke_matrix(self, l, use_magma=True, g0=None, ncpus=1):  # l can be oo
+        r"""
+        Return the matrix of the ``l``-th Hecke operator.
+
+        The columns are computed by a pool of ``ncpus`` processes (by default
+        one, that is, sequentially; None means all the available CPUs). See
+        :meth:`hecke_matrices`.
+        """
+        return self.hecke_matrices([l], use_magma=use_magma, g0=g0, ncpus=ncpus)[0]
+
+    def hecke_matrices(self, llist, use_magma=True, g0=None, ncpus=1):
+        r"""
+        Return the list of the matrices of the Hecke operators at the primes
+        in ``llist``.
+
+        The Hecke data of each prime is computed first, so that it is shared
+        by the forked workers. Then all the columns of all the matrices
+        which are not yet cached are computed by a pool of ``ncpus``
+        processes (by default one, that is, sequentially; None means all the
+        available CPUs).
+        """
+        llist = list(llist)
+        todo = [l for l in llist if not self.hecke_matrix.is_in_cache(l, use_magma, g0)]
+        if len(todo) > 0:
+            dim = self.dimension()
+            R = self.coefficient_module().base_ring()
+            group = self.group()
+            for l in todo:
+                verbose("Computing the Hecke data for prime %s" % l)
+                if hasattr(group, "get_hecke_data"):
+                    group.get_hecke_data(l, use_magma=use_magma, g0=g0)
+            gens = self.gens()
+
+            def hecke_column(lj):
+                l, j = lj
+                # Construct column j of the matrix
+                verbose(
+                    "Constructing column %s/%s of the hecke matrix for prime %s"
+                    % (j, dim, l)
+                )
+                fvals = self.apply_hecke_operator(
+                    gens[j], l, use_magma=use_magma, g0=g0
+                )
+                return list(vector(fvals))
+
+            cols = parallel_map(
+                hecke_column,
+                [(l, j) for l in todo for j in range(dim)],
+                ncpus=ncpus,
+                msg="Hecke matrix columns",
             )
-            fvals = self.apply_hecke_operator(cocycle, l, use_magma=use_magma, g0=g0)
-            M.set_column(j, list(vector(fvals)))
-        return M
+            for k, l in enumerate(todo):
+                M = matrix(R, dim, dim, 0)
+                for j in range(dim):
+                    M.set_column(j, cols[k * dim + j])
+                self.hecke_matrix.set_cache(M, l, use_magma, g0)
+        return [self.hecke_matrix(l, use_magma=use_magma, g0=g0) for l in llist]
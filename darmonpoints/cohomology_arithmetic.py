@@ -38,6 +38,7 @@ from sage.categories.homset import Hom
 from sage.groups.group import AlgebraicGroup
 from sage.matrix.constructor import Matrix, block_matrix, matrix
 from sage.matrix.matrix_space import MatrixSpace
+from sage.misc.all import walltime
 from sage.misc.cachefunc import cached_method
 from sage.misc.misc_c import prod
 from sage.misc.persist import db, db_save
@@ -67,6 +68,7 @@ from sage.structure.sage_object import SageObject, load, save
 from sage.structure.unique_representation import UniqueRepresentation
 
 from .cohomology_abstract import *
+from .integrals import _power_pairings
 from .ocbianchi import BianchiDistributions, left_ps_adjuster
 from .ocmodule import OCVn, our_adjuster, ps_adjuster
 from .representations import *
@@ -132,7 +134,46 @@ def get_overconvergent_class_quaternionic(
     use_sage_db=False,
     progress_bar=False,
     Ename="unknown",
+    up_method="naive",
+    parallelize=False,
+    ncpus=None,
+    ladder=None,
+    early_stopping=False,
+    callback=None,
 ):
+    r"""
+    Return the overconvergent lift of the cohomology class ``phiE`` to precision
+    ``prec``.
+
+    By default the lift is computed directly at precision ``prec``. If ``ladder``
+    is a list of intermediate precisions, the lift is computed along them in
+    increasing order: at each stage the lift of the previous stage is extended
+    (by padding its moments with zeros) and improved by iterating `U_p` at the
+    new precision, so that most of the iterations are done on short moment
+    vectors. Each stage builds a new overconvergent cohomology group, so the
+    ladder is ignored when ``up_method`` is ``'bigmatrix'`` (whose matrix would
+    have to be rebuilt at every stage) and when ``use_ps_dists`` is True.
+
+    The ladder is not supported when ``G`` uses Shapiro's lemma: the values
+    of the lift then lie in a coinduced module, whose elements cannot be
+    extended to a higher precision by padding. In that case it is ignored, and
+    the lift is computed directly at precision ``prec``.
+
+    The options ``early_stopping`` and ``callback`` are passed to the ``improve``
+    method of the overconvergent cohomology group at each stage.
+
+    TESTS::
+
+        sage: from darmonpoints.sarithgroup import BigArithGroup
+        sage: from darmonpoints.cohomology_arithmetic import *
+        sage: G = BigArithGroup(11, 1, 1, use_shapiro=False, outfile='/dev/null')
+        sage: Coh = ArithCoh(G)
+        sage: phiE = get_cocycle_from_elliptic_curve(Coh, EllipticCurve('11a1'), use_magma=False)
+        sage: Phi = get_overconvergent_class_quaternionic(11, phiE, G, 6, 1, 1)
+        sage: Psi = get_overconvergent_class_quaternionic(11, phiE, G, 6, 1, 1, ladder=[2, 4])
+        sage: all(a.moment(0) == b.moment(0) for a, b in zip(Phi.values(), Psi.values()))
+        True
+    """
     try:
         p = ZZ(P)
         Pnorm = p
@@ -160,12 +201,56 @@ def get_overconvergent_class_quaternionic(
             return Phi
         except OSError:
             pass
+    if ladder is not None and (
+        up_method == "bigmatrix" or use_ps_dists or G._use_shapiro
+    ):
+        verbose("Ignoring the precision ladder %s" % ladder)
+        ladder = None
+    if ladder is None:
+        ladder = []
+    ladder = sorted(set([M for M in ladder if 1 < M < prec])) + [prec]
     verbose("Computing moments...")
-    CohOC = ArithCohOverconvergent(G, base=base_ring, use_ps_dists=use_ps_dists)
-    CohOC.P_gen = G.ideal_p
-    Phi0 = CohOC(phiE)
-    verbose("Now lifting...")
-    Phi = CohOC.improve(Phi0, prec=prec, sign=sign_ap, progress_bar=progress_bar)
+    Phi = phiE
+    current_prec = 0
+    for stage, M in enumerate(ladder):
+        stage_time = walltime()
+        CohOC = ArithCohOverconvergent(G, base=Zp(p, M), use_ps_dists=use_ps_dists)
+        CohOC.P_gen = G.ideal_p
+        if current_prec == 0:
+            Phi0 = CohOC(phiE)
+        else:
+            V = CohOC.coefficient_module()
+            Phi0 = CohOC([V(o) for o in Phi.values()])
+        if len(ladder) > 1:
+            seed = CohOC(list(Phi0.values()))
+        verbose(
+            "Now lifting (stage %s/%s, precision %s)..." % (stage + 1, len(ladder), M)
+        )
+        Phi = CohOC.improve(
+            Phi0,
+            prec=M,
+            sign=sign_ap,
+            progress_bar=progress_bar,
+            method=up_method,
+            parallelize=parallelize,
+            ncpus=ncpus,
+            initial_prec=current_prec,
+            early_stopping=early_stopping,
+            callback=callback,
+        )
+        if len(ladder) > 1:
+            verbose(
+                "Stage %s/%s: precision %s -> %s (valuation of the change = %s) in %s seconds"
+                % (
+                    stage + 1,
+                    len(ladder),
+                    current_prec,
+                    M,
+                    (Phi - seed).valuation(),
+                    walltime(stage_time),
+                )
+            )
+        current_prec = M
     if use_sage_db:
         raise NotImplementedError
     verbose("Done.")
@@ -185,6 +270,10 @@ def get_overconvergent_class_bianchi(
     sign_ap=1,
     progress_bar=False,
     Ename="unknown",
+    parallelize=False,
+    ncpus=None,
+    early_stopping=False,
+    callback=None,
 ):
     p = ZZ(P.norm().factor()[0][0])
     Pnorm = ZZ(P.norm())
@@ -221,7 +310,16 @@ def get_overconvergent_class_bianchi(
     Phi0._aPbar = aPbar
 
     verbose("Now lifting...")
-    Phi = CohOC.improve(Phi0, prec=prec, sign=sign_ap, progress_bar=progress_bar)
+    Phi = CohOC.improve(
+        Phi0,
+        prec=prec,
+        sign=sign_ap,
+        progress_bar=progress_bar,
+        parallelize=parallelize,
+        ncpus=ncpus,
+        early_stopping=early_stopping,
+        callback=callback,
+    )
     Phi._aP = aP
     Phi._aPbar = aPbar
     verbose("Done.")
@@ -271,10 +369,25 @@ class ArithCohElement(CohomologyElement):
         if he is None:
             return super().evaluate(g, at_identity=at_identity)
         G = self.parent().S_arithgroup()
+        hp, newg = self._reduce_shapiro_argument(g, he, check, twist)
+        if check:
+            return G.Gpn(hp) * super().evaluate(newg, at_identity=at_identity)
+        else:
+            return super().evaluate(newg, at_identity=at_identity)
+
+    def _reduce_shapiro_argument(self, g, he, check=True, twist=False):
+        r"""
+        Return the pair ``(hp, newg)`` used by :meth:`evaluate` to evaluate the
+        corresponding element of the coinduced module at ``(g, he)``. Here
+        ``newg`` is the reduction of ``he * g`` in the amalgam, and ``hp`` is
+        None unless ``check`` is True.
+        """
+        G = self.parent().S_arithgroup()
         try:
             g = g.quaternion_rep
         except AttributeError:
             pass
+        hp = None
         if check:
             hp = G.reduce_in_amalgam(he, return_word=False)
             he = hp**-1 * he  # So that h = hp * he
@@ -283,10 +396,29 @@ class ArithCohElement(CohomologyElement):
             newg = newg.conjugate_by(G.wp())
             if check:
                 hp = hp.conjugate_by(G.wp())
+        return hp, newg
+
+    def evaluate_with_liftee(self, g, he, check=True, twist=False, at_identity=False):
+        r"""
+        Return the pair formed by ``self.evaluate(g, he)`` and the first entry
+        of ``self["liftee"].evaluate(g, he)`` (with the same options).
+
+        The reduction of ``he * g`` in the amalgam and its word in the
+        generators are computed only once and shared by both evaluations.
+        """
+        G = self.parent().S_arithgroup()
+        hp, newg = self._reduce_shapiro_argument(g, he, check, twist)
+        x = self.parent().group()(newg)
+        mu = super().evaluate(x, at_identity=at_identity)
+        liftee = self["liftee"]
+        if liftee.parent().group() is x.parent():
+            newg = x
+        mu0 = liftee.evaluate(newg, at_identity=at_identity)
         if check:
-            return G.Gpn(hp) * super().evaluate(newg, at_identity=at_identity)
-        else:
-            return super().evaluate(newg, at_identity=at_identity)
+            hp = G.Gpn(hp)
+            mu = hp * mu
+            mu0 = hp * mu0
+        return mu, mu0[0]
 
     def Tq_eigenvalue(self, ell, check=True):
         r"""
@@ -596,6 +728,123 @@ class ArithCoh(CohomologyGroup, UniqueRepresentation):
             M.set_column(j, list(vector(fvals)))
         return M
 
+    def _random_projections(self, nprojections=2):
+        r"""
+        Return ``nprojections`` random linear forms on the moments of a cocycle,
+        given as one row matrix per generator of the group.
+
+        For Bianchi distributions the `n`-th moment, corresponding to `x^i y^j`,
+        is weighted by `p^{i+j}`, so that the valuation of a projection matches
+        the filtration step computed by ``valuation``.
+        """
+        V = self.coefficient_module()
+        p = V.prime()
+        dim = V.dimension()
+        try:
+            weights = [sum(V.ij_from_pos(n)) for n in range(dim)]
+        except AttributeError:
+            weights = [0 for n in range(dim)]
+        ngens = len(self.group().gens())
+        return [
+            [
+                matrix(
+                    ZZ, 1, dim, [ZZ.random_element(1, p**2) * p**w for w in weights]
+                )
+                for _ in range(ngens)
+            ]
+            for _ in range(nprojections)
+        ]
+
+    def _projected_valuation(self, c1, c2, projections):
+        r"""
+        Estimate the valuation of ``c1 - c2`` by evaluating the forms in
+        ``projections`` (see :meth:`_random_projections`) on it.
+
+        The result is never smaller than the true valuation, and equals it with
+        probability at least `1 - p^{-k}`, where `k` is the number of projections.
+        If the coefficients are not distributions, the exact valuation is returned.
+        """
+        p = self.coefficient_module().prime()
+        diffs = [u - v for u, v in zip(c1.values(), c2.values())]
+        try:
+            moments = [o._moments.change_ring(ZZ) for o in diffs]
+        except AttributeError:
+            return min([o.valuation() for o in diffs])
+        ans = oo
+        for rr in projections:
+            s = sum(r * m for r, m in zip(rr, moments))
+            ans = min(ans, ZZ(s[0, 0]).valuation(p))
+        return ans
+
+    def _exact_valuation(self, c1, c2):
+        r"""
+        Return the valuation of ``c1 - c2``, computed on all of its moments.
+        """
+        try:
+            return min([(u - v).valuation() for u, v in zip(c1.values(), c2.values())])
+        except AttributeError:
+            return min(
+                [
+                    (u - v).valuation()
+                    for u, v in zip(
+                        [o for w in c1.values() for o in w.values()],
+                        [o for w in c2.values() for o in w.values()],
+                    )
+                ]
+            )
+
+    def _improve_early_stopping(
+        self, Phi, prec, step, nsteps=1, progress_bar=False, callback=None
+    ):
+        r"""
+        Iterate ``step`` on ``Phi`` until the difference between two consecutive
+        iterates has valuation at least ``prec``, which certifies the precision
+        of the fixed point.
+
+        The valuation is estimated with :meth:`_projected_valuation`. Since the
+        estimate may be too large, the exact valuation is computed before
+        stopping, and the iteration goes on if it is still below ``prec``. If given,
+        ``callback`` is called after each iteration with a dictionary with keys
+        ``'iteration'``, ``'valuation'``, ``'target'``, ``'time'`` (time spent in
+        the iteration) and ``'total_time'``.
+        """
+        projections = self._random_projections()
+        start = walltime()
+        h2 = Phi
+        ii = 0
+        old_val = -oo
+        stalled = 0
+        while True:
+            t = walltime()
+            h1 = h2
+            h2 = step(h1)
+            ii += nsteps
+            current_val = self._projected_valuation(h2, h1, projections)
+            if current_val >= prec:
+                # Certify the estimate, which is only an upper bound
+                current_val = self._exact_valuation(h2, h1)
+            data = {
+                "iteration": ii,
+                "valuation": current_val,
+                "target": prec,
+                "time": walltime(t),
+                "total_time": walltime(start),
+            }
+            if callback is not None:
+                callback(data)
+            if progress_bar:
+                update_progress(float(min(current_val, prec)) / float(prec), "f|Up")
+            else:
+                verbose("Applied Up %s times (val = %s)" % (ii, current_val))
+            if current_val >= prec:
+                break
+            stalled = stalled + 1 if current_val <= old_val else 0
+            if stalled >= 2:
+                raise RuntimeError("Not converging, maybe ap sign is wrong?")
+            old_val = current_val
+        Phi._val = h2._val
+        return h2
+
     def apply_hecke_operator(
         self, c, l, hecke_reps=None, group=None, scale=1, use_magma=True, g0=None
     ):
@@ -621,12 +870,16 @@ class ArithCoh(CohomologyGroup, UniqueRepresentation):
         vals = [V(0) for gamma in gammas]
         input_vector = []
         # verbose('Calculating action')
+        tis = [
+            group.get_hecke_ti(g, gamma, l, use_magma, reps=hecke_reps)
+            for gamma in gammas
+            for g in hecke_reps
+        ]
+        cvals = iter(c.evaluate_many(tis))
         for j, gamma in enumerate(gammas):
             # verbose('generator %s/%s...'%(j+1,len(gammas)))
             for g in hecke_reps:
-                vals[j] += g * c.evaluate(
-                    group.get_hecke_ti(g, gamma, l, use_magma, reps=hecke_reps)
-                )
+                vals[j] += g * next(cvals)
         return scale * self(vals)
 
 
@@ -720,15 +973,17 @@ class CohArbitrary(CohomologyGroup):
             l = None
         if hecke_data is None:
             hecke_data = group.get_hecke_data(l, hecke_reps, use_magma=use_magma, g0=g0)
-        vals = [
-            sum(
-                super(ArithCohElement, c).evaluate(
-                    hecke_data[(g, gamma.quaternion_rep)], left_act_by=group(g)
-                )
+        gammas = group.gens()
+        cvals = c.evaluate_many(
+            [
+                hecke_data[(g, gamma.quaternion_rep)]
+                for gamma in gammas
                 for g in hecke_reps
-            )
-            for gamma in group.gens()
-        ]  # DEBUG: g need not be in group...
+            ],
+            left_act_by=[group(g) for gamma in gammas for g in hecke_reps],
+        )  # DEBUG: g need not be in group...
+        n = len(hecke_reps)
+        vals = [sum(cvals[j : j + n]) for j in range(0, len(cvals), n)]
         return scale * self(vals)
 
 
@@ -767,6 +1022,83 @@ class ArithCohOverconvergent(ArithCoh):
         S0 = V.Sigma0()
         return [S0(self.group().embed(g, prec), check=False) for g in Up_reps]
 
+    @cached_method
+    def get_Up_bigmatrix(self, prec=None):
+        r"""
+        Return the matrix of `U_p` acting on the stacked moments of the values of a
+        cocycle at the generators of the group, with entries in `\ZZ/p^M\ZZ`.
+
+        The block in position `(j, i)` gives the contribution of the value at the
+        `i`-th generator to the value of `U_p` at the `j`-th generator. It is the
+        sum over the `U_p` representatives `s_k` of the matrix of `s_k` times the
+        Fox derivative of `t_k(\gamma_j)` with respect to `\gamma_i`.
+
+        The matrix is returned as a :class:`darmonpoints.util.BlockSparseMatrix`,
+        which only stores the nonzero blocks.
+
+        TESTS::
+
+            sage: from darmonpoints.sarithgroup import BigArithGroup
+            sage: from darmonpoints.cohomology_arithmetic import ArithCohOverconvergent
+            sage: G = BigArithGroup(11, 1, 1, use_shapiro=False, outfile='/dev/null')
+            sage: HOC = ArithCohOverconvergent(G, base=Zp(11, 4))
+            sage: V = HOC.coefficient_module()
+            sage: ngens = len(HOC.group().gens())
+            sage: Phi0 = HOC([V([j + k for k in range(V.dimension())]) for j in range(ngens)])
+            sage: A = HOC._stack_moments(HOC.apply_Up(Phi0))
+            sage: B = HOC._stack_moments(HOC.apply_Up(Phi0, method='bigmatrix'))
+            sage: A == B
+            True
+
+        ::
+
+            sage: from darmonpoints.sarithgroup import BigArithGroup
+            sage: from darmonpoints.cohomology_arithmetic import *
+            sage: G = BigArithGroup(5,6,1,use_shapiro=False,outfile='/tmp/darmonpoints.tmp') #  optional - magma
+            sage: Coh = ArithCoh(G) #  optional - magma
+            sage: phiE = get_cocycle_from_elliptic_curve(Coh, EllipticCurve('30a1')) #  optional - magma
+            sage: HOC = ArithCohOverconvergent(G, base=Zp(5,6)) #  optional - magma
+            sage: Phi0 = HOC(phiE) #  optional - magma
+            sage: A = HOC._stack_moments(HOC.apply_Up(Phi0)) #  optional - magma
+            sage: B = HOC._stack_moments(HOC.apply_Up(Phi0, method='bigmatrix')) #  optional - magma
+            sage: A == B #  optional - magma
+            True
+        """
+        if self.use_shapiro():
+            raise NotImplementedError("The bigmatrix method needs use_shapiro = False")
+        V = self.coefficient_module()
+        if not isinstance(V, OCVn):
+            raise NotImplementedError("The bigmatrix method needs use_ps_dists = False")
+        if prec is None:
+            prec = V.base_ring().precision_cap()
+        R = V.approx_module().base_ring()
+        dim = V.dimension()
+        Gpn = self.group()
+        gammas = Gpn.gens()
+        Up_reps = self.S_arithgroup().get_Up_reps()
+        repslocal = self.get_Up_reps_local(prec)
+        ans = BlockSparseMatrix(R.order(), len(gammas), dim)
+        skmats = [ans._to_working(V.acting_matrix(sk, dim)) for sk in repslocal]
+        for j, gamma in enumerate(gammas):
+            verbose("Up bigmatrix: row %s/%s" % (j + 1, len(gammas)))
+            for A, g in zip(skmats, Up_reps):
+                wd = Gpn.get_hecke_ti(g, gamma).word_rep
+                for i, a in enumerate(self.fox_gradient_matrices(tuple(wd))):
+                    if a == 0:
+                        continue
+                    ans.add_to_block(j, i, A * ans._to_working(a))
+        verbose("Up bigmatrix: %s nonzero blocks" % ans.nonzero_blocks())
+        return ans
+
+    def _stack_moments(self, c):
+        R = self.coefficient_module().approx_module().base_ring()
+        return vector(R, sum([o._val.list() for o in c.values()], []))
+
+    def _unstack_moments(self, X):
+        V = self.coefficient_module()
+        dim = V.dimension()
+        return self([V(X[i : i + dim].list()) for i in range(0, len(X), dim)])
+
     def apply_Up(
         self,
         c,
@@ -776,11 +1108,29 @@ class ArithCohOverconvergent(ArithCoh):
         progress_bar=False,
         repslocal=None,
         Up_reps=None,
+        method="naive",
+        parallelize=False,
+        ncpus=None,
     ):  # one-variable overconvergent
         r"""
         Apply the Up Hecke operator operator to ``c``.
+
+        If ``method`` is ``'bigmatrix'``, then use the precomputed matrix of
+        :meth:`get_Up_bigmatrix` instead of evaluating ``c`` at group words.
+
+        If ``parallelize`` is True, then the values at the generators (and at the
+        coset representatives, when using Shapiro's lemma) are computed by a pool
+        of ``ncpus`` processes (by default, all available ones).
         """
         V = self.coefficient_module()
+        if method == "bigmatrix":
+            U = self.get_Up_bigmatrix()
+            ans = self._unstack_moments(U * self._stack_moments(c))
+            if scale != 1:
+                ans *= scale
+            return ans
+        elif method != "naive":
+            raise ValueError("method (= %s) should be 'naive' or 'bigmatrix'" % method)
         R = V.base_ring()
         gammas = self.group().gens()
 
@@ -798,42 +1148,88 @@ class ArithCohOverconvergent(ArithCoh):
         G = self.S_arithgroup()
         Gn = G.large_group()
         if self.use_shapiro():
-            vals = [
-                [V.coefficient_module()(0, normalize=False) for xi in G.coset_reps()]
-                for gamma in gammas
-            ]
-            for j, gamma in enumerate(gammas):
-                for i, xi in enumerate(G.coset_reps()):
-                    delta = Gn(
-                        G.get_coset_ti(set_immutable(xi * gamma.quaternion_rep))[0]
-                    )
-                    vals[j][i] += sum(
-                        (
-                            sk * c.evaluate(Gn.get_hecke_ti(g, delta), at_identity=True)
-                            for sk, g in zip(repslocal, Up_reps)
-                        )
+            W = V.coefficient_module()
+            coset_reps = G.coset_reps()
+
+            def Up_value(gamma, xi):
+                delta = Gn(G.get_coset_ti(set_immutable(xi * gamma.quaternion_rep))[0])
+                return W(0, normalize=False) + sum(
+                    (
+                        sk * c.evaluate(Gn.get_hecke_ti(g, delta), at_identity=True)
+                        for sk, g in zip(repslocal, Up_reps)
                     )
+                )
+
+            if parallelize:
+                inputs = [(gamma, xi) for gamma in gammas for xi in coset_reps]
+                flat_vals = parallel_map(
+                    lambda x: Up_value(*x),
+                    inputs,
+                    ncpus=ncpus,
+                    progress_bar=progress_bar,
+                    msg="Up action",
+                )
+                n = len(coset_reps)
+                vals = [
+                    [W(o) for o in flat_vals[j : j + n]]
+                    for j in range(0, len(flat_vals), n)
+                ]
+            else:
+                vals = [[Up_value(gamma, xi) for xi in coset_reps] for gamma in gammas]
             ans = self([V(o) for o in vals])
         else:  # not shapiro
             Gpn = G.small_group()
-            vals = []
-            for gamma in gammas:
-                vals.append(
-                    sum(
-                        (
-                            sk * c.evaluate(Gpn.get_hecke_ti(g, gamma))
-                            for sk, g in zip(repslocal, Up_reps)
+
+            def Up_value(gamma):
+                return sum(
+                    (
+                        sk * c.evaluate(Gpn.get_hecke_ti(g, gamma))
+                        for sk, g in zip(repslocal, Up_reps)
+                    ),
+                    V(0, normalize=False),
+                )
+
+            if parallelize:
+                vals = parallel_map(
+                    Up_value,
+                    gammas,
+                    ncpus=ncpus,
+                    progress_bar=progress_bar,
+                    msg="Up action",
+                )
+                vals = [V(o) for o in vals]
+            elif hasattr(V, "act_many"):
+                # Act by each representative on all the values at once
+                vals = [V(0, normalize=False) for gamma in gammas]
+                for sk, g in zip(repslocal, Up_reps):
+                    acted = V.act_many(
+                        sk,
+                        c.evaluate_many(
+                            [Gpn.get_hecke_ti(g, gamma) for gamma in gammas]
                         ),
-                        V(0, normalize=False),
                     )
-                )
+                    vals = [u + v for u, v in zip(vals, acted)]
+            else:
+                vals = [Up_value(gamma) for gamma in gammas]
             ans = self(vals)
         if scale != 1:
             ans *= scale
         return ans
 
     def improve(
-        self, Phi, prec=None, sign=None, progress_bar=False, check_convergence=False
+        self,
+        Phi,
+        prec=None,
+        sign=None,
+        progress_bar=False,
+        check_convergence=False,
+        method="naive",
+        repeated_squaring=False,
+        parallelize=False,
+        ncpus=None,
+        initial_prec=0,
+        early_stopping=False,
+        callback=None,
     ):
         r"""
 
@@ -842,22 +1238,109 @@ class ArithCohOverconvergent(ArithCoh):
 
         (Applies Greenberg's lifting idea; see his paper in Israel J. Math.)
 
+        If ``method`` is ``'bigmatrix'``, then `U_p` is assembled once as a matrix
+        (see :meth:`get_Up_bigmatrix`) and iterating amounts to matrix-vector
+        products. In that case, setting ``repeated_squaring`` to True computes
+        a power `U_p^{2^k}` with `2^k \geq` ``prec`` by repeated squaring and
+        applies it once. The powers of `U_p` quickly fill in all the blocks, so
+        each squaring costs as much as a dense product: this only pays off for
+        small groups, while the default iteration only needs products by the
+        nonzero blocks of `U_p`.
+
+        The options ``parallelize`` and ``ncpus`` are passed to :meth:`apply_Up`.
+
+        If ``Phi`` is already known to be correct up to precision ``initial_prec``
+        (for instance, because it comes from a lift at lower precision), then only
+        the remaining iterations are done.
+
+        If ``early_stopping`` is True, then after each application of `U_p^2`
+        the gain in precision is measured on a couple of random projections of
+        the moments, and the iteration stops as soon as it reaches ``prec``
+        (which is then checked on all the moments). The function ``callback``,
+        if given, receives a dictionary with the iteration number, the
+        valuation and the timings after each iteration (see
+        :meth:`_improve_early_stopping`). With ``method='bigmatrix'``, the
+        iterations are matrix-vector products, and ``repeated_squaring`` can
+        not be used together with ``early_stopping``.
+
         """
         U = self.coefficient_module()
         group = self.group()
         if prec is None:
             prec = U.base_ring().precision_cap()
         assert prec is not None
+        if early_stopping:
+            if method == "naive":
+
+                def step(h):
+                    for _ in range(2):
+                        h = self.apply_Up(
+                            h,
+                            group=group,
+                            scale=1,
+                            times=0,
+                            progress_bar=False,
+                            parallelize=parallelize,
+                            ncpus=ncpus,
+                        )
+                    return h
+
+            elif method == "bigmatrix":
+                if repeated_squaring:
+                    raise ValueError(
+                        "early_stopping can not be used with repeated_squaring"
+                    )
+                Upmat = self.get_Up_bigmatrix()
+
+                def step(h):
+                    return self._unstack_moments(
+                        Upmat * (Upmat * self._stack_moments(h))
+                    )
+
+            else:
+                raise ValueError(
+                    "method (= %s) should be 'naive' or 'bigmatrix'" % method
+                )
+            return self._improve_early_stopping(
+                Phi, prec, step, 2, progress_bar, callback
+            )
+        if method == "bigmatrix":
+            return self._improve_bigmatrix(
+                Phi,
+                prec,
+                progress_bar,
+                check_convergence,
+                repeated_squaring,
+                initial_prec,
+            )
+        elif method != "naive":
+            raise ValueError("method (= %s) should be 'naive' or 'bigmatrix'" % method)
         repslocal = self.get_Up_reps_local(prec)
 
-        h2 = self.apply_Up(Phi, group=group, scale=1, times=0, progress_bar=False)
+        h2 = self.apply_Up(
+            Phi,
+            group=group,
+            scale=1,
+            times=0,
+            progress_bar=False,
+            parallelize=parallelize,
+            ncpus=ncpus,
+        )
         if progress_bar:
             update_progress(float(0) / float(prec), "f|Up")
         else:
             verbose("Applied Up once")
 
-        h2 = self.apply_Up(h2, group=group, scale=1, times=0, progress_bar=False)
-        ii = 0
+        h2 = self.apply_Up(
+            h2,
+            group=group,
+            scale=1,
+            times=0,
+            progress_bar=False,
+            parallelize=parallelize,
+            ncpus=ncpus,
+        )
+        ii = initial_prec
         try:
             current_val = min(
                 [
@@ -881,12 +1364,28 @@ class ArithCohOverconvergent(ArithCoh):
             h1 = h2
             old_val = current_val
             ii += 2
-            h2 = self.apply_Up(h1, group=group, scale=1, times=0, progress_bar=False)
+            h2 = self.apply_Up(
+                h1,
+                group=group,
+                scale=1,
+                times=0,
+                progress_bar=False,
+                parallelize=parallelize,
+                ncpus=ncpus,
+            )
             if progress_bar:
                 update_progress(float(current_val) / float(prec), "f|Up")
             else:
                 verbose("Applied Up %s times (val = %s)" % (ii + 1, current_val))
-            h2 = self.apply_Up(h2, group=group, scale=1, times=0, progress_bar=False)
+            h2 = self.apply_Up(
+                h2,
+                group=group,
+                scale=1,
+                times=0,
+                progress_bar=False,
+                parallelize=parallelize,
+                ncpus=ncpus,
+            )
             if check_convergence:
                 try:
                     current_val = min(
@@ -903,7 +1402,7 @@ class ArithCohOverconvergent(ArithCoh):
                         ]
                     )
 
-                if ii == 2 and current_val <= old_val:
+                if ii == initial_prec + 2 and current_val <= old_val:
                     raise RuntimeError("Not converging, maybe ap sign is wrong?")
             else:
                 current_val = ii
@@ -916,6 +1415,57 @@ class ArithCohOverconvergent(ArithCoh):
             update_progress(1.0, "f|Up")
         return h2
 
+    def _improve_bigmatrix(
+        self,
+        Phi,
+        prec,
+        progress_bar=False,
+        check_convergence=False,
+        squaring=False,
+        initial_prec=0,
+    ):
+        p = self.coefficient_module().prime()
+        U = self.get_Up_bigmatrix()
+        X = self._stack_moments(Phi)
+        if squaring:
+            W = U * U
+            k = 2
+            while k < prec - initial_prec:
+                W = W * W
+                k *= 2
+                if progress_bar:
+                    update_progress(float(k) / float(prec), "f|Up")
+                else:
+                    verbose("Computed Up^%s" % k)
+            X = W * X
+        else:
+            valuation = lambda Y: min([ZZ(o).valuation(p) for o in Y.list()])
+            X2 = U * (U * X)
+            current_val = valuation(X2 - X)
+            old_val = current_val - 1
+            ii = initial_prec + 2
+            while current_val < prec and current_val > old_val:
+                X1 = X2
+                old_val = current_val
+                X2 = U * (U * X1)
+                ii += 2
+                if check_convergence:
+                    current_val = valuation(X2 - X1)
+                    if ii == initial_prec + 4 and current_val <= old_val:
+                        raise RuntimeError("Not converging, maybe ap sign is wrong?")
+                else:
+                    current_val = ii
+                if progress_bar:
+                    update_progress(float(current_val) / float(prec), "f|Up")
+                else:
+                    verbose("Applied Up %s times (val = %s)" % (ii, current_val))
+            X = X2
+        h2 = self._unstack_moments(X)
+        Phi._val = h2._val
+        if progress_bar:
+            update_progress(1.0, "f|Up")
+        return h2
+
     def get_Lseries_term(self, phi, n, cov=None):
         r"""
         Return the `n`-th coefficient of the `p`-adic `L`-series attached to an
@@ -986,11 +1536,14 @@ class ArithCohOverconvergent(ArithCoh):
 
             ## Range over all remaining reps of the U_p operator, and add the relevant integral
             ## To add twists by psi: only need to add psi_P(aa) to the sum for f
+            ## The basic integrals of (z/aa - 1)^j are computed together for all j
             for h in cov:
                 alpha = h[0, 1] / h[1, 1]  ## If h = (p, a; 0, 1), this is a
                 aa = K.teichmuller(alpha)  ## compute Teich lift of alpha
-                f = sum(lj * (1 / aa * z - 1) ** j for j, lj in enumerate(lb_n))
-                dn += phi.BI(h, None).evaluate_at_poly(f)
+                mu = phi.BI(h, None)
+                moments = [mu.moment(i) for i in range(len(mu.moments()))]
+                BIs = _power_pairings(moments, 1 / aa * z - 1, len(lb_n) - 1, K)
+                dn += sum(lj * BIj for lj, BIj in zip(lb_n, BIs))
             ## Store in dictionary of L_p series coefficients
             phi._Lseries_coefficients[n] = dn.add_bigoh(precision)
             return phi._Lseries_coefficients[n]
@@ -1037,7 +1590,60 @@ class ArithCohBianchi(ArithCoh):
             ans1.append(S0(emb0(gbar, prec), emb1(gbar, prec)))
         return ans0, ans1
 
-    def apply_Up1(self, c, group=None, scale=1, progress_bar=False):  # bianchi
+    def _parallel_Up_values(self, input_vec, ncpus=None, progress_bar=False):
+        r"""
+        Compute the values of `U_p` at the generators by distributing the
+        entries of ``input_vec`` (as built by :meth:`apply_Up1`, :meth:`apply_Up2`
+        and :meth:`apply_Up`) over a pool of ``ncpus`` processes.
+        """
+        V = self.coefficient_module()
+
+        def Up_value(inp):
+            lst, c, j = inp
+            outp = V(0, normalize=False)
+            for sk, tt in lst:
+                outp += sk * c.evaluate(tt)
+            return outp
+
+        vals = parallel_map(
+            Up_value,
+            input_vec,
+            ncpus=ncpus,
+            progress_bar=progress_bar,
+            msg="Up action (%s)" % len(input_vec),
+        )
+        return [V(o) for o in vals]
+
+    def _sequential_Up_values(self, input_vec, progress_bar=False):
+        r"""
+        Compute the values of `U_p` at the generators from the entries of
+        ``input_vec`` (as built by :meth:`apply_Up1`, :meth:`apply_Up2` and
+        :meth:`apply_Up`) in this process.
+
+        The pairs formed by each representative and the value it acts on are
+        collected for all the generators, so that each representative acts on
+        all its values with a single matrix product (see
+        :meth:`darmonpoints.ocbianchi.BianchiDistributions.act_pairs`).
+        """
+        V = self.coefficient_module()
+        pairs = []
+        index = []
+        for n, (lst, c, j) in enumerate(input_vec):
+            values = c.evaluate_many([tt for sk, tt in lst])
+            pairs.extend((sk, v) for (sk, tt), v in zip(lst, values))
+            index.extend(j for _ in lst)
+            if progress_bar:
+                update_progress(
+                    float(n + 1) / len(input_vec), "Up action (%s)" % len(input_vec)
+                )
+        vals = [V(0, normalize=False) for _ in input_vec]
+        for j, v in zip(index, V.act_pairs(pairs)):
+            vals[j] += v
+        return vals
+
+    def apply_Up1(
+        self, c, group=None, scale=1, progress_bar=False, parallelize=False, ncpus=None
+    ):  # bianchi
         V = self.coefficient_module()
         R = V.base_ring()
         gammas = self.group().gens()
@@ -1079,26 +1685,18 @@ class ArithCohBianchi(ArithCoh):
                 )
             )
 
-        vals = [V(0, normalize=False) for gamma in gammas]
-        pb_fraction = QQ(1) / (2 * len(repslocal) * len(input_vec))
-        progress = 0
-        for lst, c, j in input_vec:
-            outp = V(0, normalize=False)
-            for sk, tt in lst:
-                progress += pb_fraction
-                outp += sk * c.evaluate(tt)
-                if progress_bar:
-                    update_progress(
-                        float(progress),
-                        "Up action (%s)" % (2 * len(repslocal) * len(input_vec)),
-                    )
-            vals[j] += outp
+        if parallelize:
+            vals = self._parallel_Up_values(input_vec, ncpus, progress_bar)
+        else:
+            vals = self._sequential_Up_values(input_vec, progress_bar)
         ans = self(vals)
         if scale != 1:
             ans = scale * ans
         return ans
 
-    def apply_Up2(self, c, group=None, scale=1, progress_bar=False):  # bianchi
+    def apply_Up2(
+        self, c, group=None, scale=1, progress_bar=False, parallelize=False, ncpus=None
+    ):  # bianchi
         V = self.coefficient_module()
         R = V.base_ring()
         gammas = self.group().gens()
@@ -1140,26 +1738,18 @@ class ArithCohBianchi(ArithCoh):
                 )
             )
 
-        vals = [V(0, normalize=False) for gamma in gammas]
-        pb_fraction = QQ(1) / (2 * len(repslocal_bar) * len(input_vec))
-        progress = 0
-        for lst, c, j in input_vec:
-            outp = V(0, normalize=False)
-            for sk, tt in lst:
-                progress += pb_fraction
-                outp += sk * c.evaluate(tt)
-                if progress_bar:
-                    update_progress(
-                        float(progress),
-                        "Up action (%s)" % (2 * len(repslocal_bar) * len(input_vec)),
-                    )
-            vals[j] += outp
+        if parallelize:
+            vals = self._parallel_Up_values(input_vec, ncpus, progress_bar)
+        else:
+            vals = self._sequential_Up_values(input_vec, progress_bar)
         ans = self(vals)
         if scale != 1:
             ans = scale * ans
         return ans
 
-    def apply_Up(self, c, group=None, scale=1, progress_bar=False):  # bianchi
+    def apply_Up(
+        self, c, group=None, scale=1, progress_bar=False, parallelize=False, ncpus=None
+    ):  # bianchi
         V = self.coefficient_module()
         R = V.base_ring()
         gammas = self.group().gens()
@@ -1201,20 +1791,10 @@ class ArithCohBianchi(ArithCoh):
                 )
             )
 
-        vals = [V(0, normalize=False) for gamma in gammas]
-        pb_fraction = QQ(1) / (2 * len(repslocal) * len(input_vec))
-        progress = 0
-        for lst, c, j in input_vec:
-            outp = V(0, normalize=False)
-            for sk, tt in lst:
-                progress += pb_fraction
-                outp += sk * c.evaluate(tt)
-                if progress_bar:
-                    update_progress(
-                        float(progress),
-                        "Up action (%s)" % (2 * len(repslocal) * len(input_vec)),
-                    )
-            vals[j] += outp
+        if parallelize:
+            vals = self._parallel_Up_values(input_vec, ncpus, progress_bar)
+        else:
+            vals = self._sequential_Up_values(input_vec, progress_bar)
         ans = self(vals)
         c = ans
         input_vec = []
@@ -1235,25 +1815,27 @@ class ArithCohBianchi(ArithCoh):
                 )
             )
 
-        vals = [V(0, normalize=False) for gamma in gammas]
-        for lst, c, j in input_vec:
-            outp = V(0, normalize=False)
-            for sk, tt in lst:
-                progress += pb_fraction
-                outp += sk * c.evaluate(tt)
-                if progress_bar:
-                    update_progress(
-                        float(progress),
-                        "Up action (%s)" % (2 * len(repslocal) * len(input_vec)),
-                    )
-            vals[j] += outp
+        if parallelize:
+            vals = self._parallel_Up_values(input_vec, ncpus, progress_bar)
+        else:
+            vals = self._sequential_Up_values(input_vec, progress_bar)
         ans = self(vals)
 
         if scale != 1:
             ans = scale * ans
         return ans
 
-    def improve(self, Phi, prec=None, sign=None, progress_bar=False):
+    def improve(
+        self,
+        Phi,
+        prec=None,
+        sign=None,
+        progress_bar=False,
+        parallelize=False,
+        ncpus=None,
+        early_stopping=False,
+        callback=None,
+    ):
         r"""
 
         Repeatedly applies U_p. Used in lifting theorems: 'improves' the precision of
@@ -1261,17 +1843,46 @@ class ArithCohBianchi(ArithCoh):
 
         (Applies the Bianchi version of Greenberg's lifting idea)
 
+        The options ``parallelize`` and ``ncpus`` are passed to :meth:`apply_Up`.
+
+        If ``early_stopping`` is True, the filtration step gained at each iteration
+        is measured on random projections of the moments, and the iteration
+        stops as soon as it reaches ``prec``. The function ``callback`` receives
+        the per-iteration telemetry (see :meth:`_improve_early_stopping`).
+
         """
         U = self.coefficient_module()
         group = self.group()
         if prec is None:
             prec = U.base_ring().precision_cap()
         assert prec is not None
+        if early_stopping:
+
+            def step(h):
+                return self.apply_Up(
+                    h,
+                    group=group,
+                    scale=sign,
+                    progress_bar=False,
+                    parallelize=parallelize,
+                    ncpus=ncpus,
+                )
+
+            return self._improve_early_stopping(
+                Phi, prec, step, 1, progress_bar, callback
+            )
 
         pi, pi_bar = self.P_gen, self.Pbar_gen
         p = pi.norm()
 
-        h2 = self.apply_Up(Phi, group=group, scale=sign, progress_bar=progress_bar)
+        h2 = self.apply_Up(
+            Phi,
+            group=group,
+            scale=sign,
+            progress_bar=progress_bar,
+            parallelize=parallelize,
+            ncpus=ncpus,
+        )
 
         if progress_bar:
             update_progress(float(0) / float(prec), "f|Up")
@@ -1291,7 +1902,14 @@ class ArithCohBianchi(ArithCoh):
             h1 = h2
             old_val = current_val
             ii += 1
-            h2 = self.apply_Up(h1, group=group, scale=sign, progress_bar=progress_bar)
+            h2 = self.apply_Up(
+                h1,
+                group=group,
+                scale=sign,
+                progress_bar=progress_bar,
+                parallelize=parallelize,
+                ncpus=ncpus,
+            )
 
             if progress_bar:
                 update_progress(float(current_val) / float(prec), "f|Up")
@@ -1466,10 +2084,15 @@ def get_cocycle_from_elliptic_curve(Coh, E, sign=1, use_magma=True, **kwargs):
 
 def get_rational_cocycle_from_ap(Coh, getap, sign=1, use_magma=True, **kwargs):
     F = Coh.group().base_ring()
+    ncpus = kwargs.get("ncpus", 1)
     if F.signature()[1] == 0 or (
         F.signature() == (0, 1) and "G" not in Coh.group()._grouptype
     ):
-        K = (Coh.hecke_matrix(oo).transpose() - sign).kernel().change_ring(QQ)
+        K = (
+            (Coh.hecke_matrix(oo, ncpus=ncpus).transpose() - sign)
+            .kernel()
+            .change_ring(QQ)
+        )
     else:
         K = Matrix(QQ, Coh.dimension(), Coh.dimension(), 0).kernel()
 
@@ -1494,7 +2117,10 @@ def get_rational_cocycle_from_ap(Coh, getap, sign=1, use_magma=True, **kwargs):
                 try:
                     K1 = (
                         Coh.hecke_matrix(
-                            qq.gens_reduced()[0], g0=g0, use_magma=use_magma
+                            qq.gens_reduced()[0],
+                            g0=g0,
+                            use_magma=use_magma,
+                            ncpus=ncpus,
                         ).transpose()
                         - ap
                     ).kernel()
@@ -1512,10 +2138,15 @@ def get_rational_cocycle(
     Coh, sign=1, use_magma=True, bound=3, return_all=False, **kwargs
 ):
     F = Coh.group().base_ring()
+    ncpus = kwargs.get("ncpus", 1)
     if F.signature()[1] == 0 or (
         F.signature()[1] == 1 and "G" not in Coh.group()._grouptype
     ):
-        K = (Coh.hecke_matrix(oo).transpose() - sign).kernel().change_ring(QQ)
+        K = (
+            (Coh.hecke_matrix(oo, ncpus=ncpus).transpose() - sign)
+            .kernel()
+            .change_ring(QQ)
+        )
     else:
         K = Matrix(QQ, Coh.dimension(), Coh.dimension(), 0).kernel()
 
@@ -1548,7 +2179,10 @@ def get_rational_cocycle(
                 try:
                     Aq = (
                         Coh.hecke_matrix(
-                            qq.gens_reduced()[0], g0=g0, use_magma=use_magma
+                            qq.gens_reduced()[0],
+                            g0=g0,
+                            use_magma=use_magma,
+                            ncpus=ncpus,
                         )
                         .transpose()
                         .change_ring(QQ)
@@ -1601,6 +2235,7 @@ def get_twodim_cocycle(
     Coh, sign=1, use_magma=True, bound=5, hecke_data=None, return_all=False, **kwargs
 ):
     outfile = kwargs.get("outfile", None)
+    ncpus = kwargs.get("ncpus", 1)
     F = Coh.group().base_ring()
     if F == QQ:
         F = NumberField(PolynomialRing(QQ, "x").gen(), names="r")
@@ -1609,7 +2244,7 @@ def get_twodim_cocycle(
     if F.signature()[1] == 0 or (
         F.signature() == (0, 1) and "G" not in Coh.group()._grouptype
     ):
-        Tinf = Coh.hecke_matrix(oo).transpose()
+        Tinf = Coh.hecke_matrix(oo, ncpus=ncpus).transpose()
         K = (Tinf - sign).kernel().change_ring(QQ)
         if K.dimension() >= 2:
             component_list.append((K, [(oo, Tinf)]))
@@ -1635,7 +2270,7 @@ def get_twodim_cocycle(
         qq = F.ideal(hecke_data[0])
         pol = hecke_data[1]
         Aq = (
-            Coh.hecke_matrix(qq.gens_reduced()[0], use_magma=use_magma)
+            Coh.hecke_matrix(qq.gens_reduced()[0], use_magma=use_magma, ncpus=ncpus)
             .transpose()
             .change_ring(QQ)
         )
@@ -1680,7 +2315,10 @@ def get_twodim_cocycle(
                 try:
                     Aq = (
                         Coh.hecke_matrix(
-                            qq.gens_reduced()[0], g0=g0, use_magma=use_magma
+                            qq.gens_reduced()[0],
+                            g0=g0,
+                            use_magma=use_magma,
+                            ncpus=ncpus,
                         )
                         .transpose()
                         .change_ring(QQ)
@@ -21,7 +21,7 @@ from sage.schemes.curves.constructor import Curve
 
 from .cohomology_arithmetic import *
 from .homology import *
-from .integrals import double_integral_zero_infty, integrate_H1
+from .integrals import covering_edge_table, double_integral_scheduled, integrate_H1
 from .limits import find_optimal_embeddings, find_tau0_and_gtau, num_evals
 from .sarithgroup import BigArithGroup
 from .util import (
@@ -219,6 +219,11 @@ def darmon_point(
     use_magma = param.get("use_magma", True)
     progress_bar = param.get("progress_bar", True)
     sign_at_infinity = param.get("sign_at_infinity", ZZ(1))
+    up_method = param.get("up_method", "naive")
+    parallelize = param.get("parallelize", False)
+    ncpus = param.get("ncpus", None)
+    early_stopping = param.get("early_stopping", False)
+    ladder = param.get("ladder", None)
 
     # Get darmon_point specific parameters
     idx_orientation = param.get("idx_orientation")
@@ -226,6 +231,7 @@ def darmon_point(
     algorithm = param.get("algorithm")
     quaternionic = param.get("quaternionic")
     cohomological = param.get("cohomological", True)
+    modsym_cache_size = param.get("modsym_cache_size", None)
 
     if working_prec is None:
         working_prec = max([2 * prec + 10, 30])
@@ -412,7 +418,12 @@ def darmon_point(
                 "r = %s, so a_r(E) - r - 1 = %s" % (ell, eisenstein_constant), outfile
             )
             fwrite("exponent = %s" % nn, outfile)
-            phiE = get_cocycle_from_elliptic_curve(Coh, E, sign=sign_at_infinity)
+            phiE = get_cocycle_from_elliptic_curve(
+                Coh,
+                E,
+                sign=sign_at_infinity,
+                ncpus=ncpus if parallelize else 1,
+            )
             if hasattr(E, "ap"):
                 sign_ap = E.ap(P)
             else:
@@ -436,6 +447,11 @@ def darmon_point(
                 use_sage_db=use_sage_db,
                 progress_bar=progress_bar,
                 Ename=Ename,
+                up_method=up_method,
+                parallelize=parallelize,
+                ncpus=ncpus,
+                ladder=ladder,
+                early_stopping=early_stopping,
             )
             # Integration with moments
             tot_time = walltime()
@@ -447,6 +463,7 @@ def darmon_point(
                 prec=working_prec,
                 twist=True,
                 progress_bar=progress_bar,
+                ncpus=ncpus if parallelize else 1,
             )
             verbose("integration tot_time = %s" % walltime(tot_time))
             if use_sage_db:
@@ -524,22 +541,39 @@ def darmon_point(
                 progress_bar=progress_bar,
             )
 
+            # Schedule the integrals of all the embeddings together
+            covering_edge_table(Phi, modsym_cache_size)
+            all_limits = [
+                (i, t1, t2) for i, emb in enumerate(emblist) for t1, t2 in emb[3]
+            ]
+            fwrite(
+                "Computing %s periods...(total of %s evaluations)"
+                % (len(emblist), sum(num_evals(t1, t2) for _, t1, t2 in all_limits)),
+                outfile,
+            )
+            values, report = double_integral_scheduled(
+                Phi,
+                [(t1, t2) for _, t1, t2 in all_limits],
+                ncpus=ncpus if parallelize else 1,
+            )
             J = 1
             for i, emb in enumerate(emblist):
                 fwrite(
-                    "Computing %s-th period, attached to the embedding: %s"
+                    "%s-th period, attached to the embedding: %s"
                     % (i, Wlist[i].list()),
                     outfile,
                 )
-                tau, gtau, sign, limits = emb
-                n_evals = sum((num_evals(t1, t2) for t1, t2 in limits))
-                fwrite(
-                    "Computing one period...(total of %s evaluations)" % n_evals,
-                    outfile,
-                )
-                newJ = prod(
-                    (double_integral_zero_infty(Phi, t1, t2) for t1, t2 in limits)
-                ) ** ZZ(sign)
+                sign = emb[2]
+                newJ = 1
+                for (j, _, _), val, rep in zip(all_limits, values, report):
+                    if j == i:
+                        fwrite(
+                            "  predicted %s evaluations, did %s"
+                            % (rep["predicted"], rep["actual"]),
+                            outfile,
+                        )
+                        newJ *= val
+                newJ = newJ ** ZZ(sign)
                 Jlist.append(newJ)
                 J *= newJ
     else:  # input_data is not None
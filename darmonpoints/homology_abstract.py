@@ -12,6 +12,7 @@ from itertools import chain, groupby, islice, product, starmap, tee
 from sage.categories.action import Action
 from sage.matrix.all import Matrix, matrix
 from sage.misc.cachefunc import cached_method
+from sage.misc.lazy_attribute import lazy_attribute
 from sage.misc.verbose import verbose
 from sage.modules.free_module_element import vector
 from sage.modules.module import Module
@@ -106,6 +107,7 @@ class HomologyGroup(Module, UniqueRepresentation):
                 return MatrixSpace(V.base_ring(), V.dimension(), V.dimension())(1)
 
         self._acting_matrix = acting_matrix
+        self._space_algorithm = self.default_space_algorithm
         gens_local = [(g, g**-1) for g in G.gens()]
         onemat = G(1)
         try:
@@ -127,10 +129,30 @@ class HomologyGroup(Module, UniqueRepresentation):
     def coefficient_module(self):
         return self._coeffmodule
 
+    # Linear algebra used by space (see set_space_algorithm)
+    default_space_algorithm = "default"
+
+    def set_space_algorithm(self, algorithm):
+        r"""
+        Choose how :meth:`space` computes the kernel of the cycle
+        conditions. See :func:`darmonpoints.util.sparse_right_kernel_matrix`
+        for the possible values of ``algorithm``.
+        """
+        if algorithm not in ("default", "dense", "sparse", "modular"):
+            raise ValueError(
+                "algorithm (= %s) should be 'default', 'dense', 'sparse' or 'modular'"
+                % algorithm
+            )
+        self._space_algorithm = algorithm
+        self.space.clear_cache()
+
     @cached_method
     def space(self):
         r"""
         Calculates the homology space as a Z-module.
+
+        The cycle conditions are assembled as a sparse matrix, whose kernel
+        is computed as chosen by :meth:`set_space_algorithm`.
         """
         verb = get_verbose()
         set_verbose(0)
@@ -141,11 +163,17 @@ class HomologyGroup(Module, UniqueRepresentation):
         gens = G.gens()
         ambient = R ** (Vdim * len(gens))
         # Now find the subspace of cycles
-        A = Matrix(R, Vdim, 0)
+        entries = {}
+        col = 0
         for g in gens:
             for v in V.gens():
-                A = A.augment(matrix(R, Vdim, 1, list(vector(g**-1 * v - v))))
-        K = A.right_kernel_matrix()
+                for a, x in enumerate(vector(g**-1 * v - v)):
+                    if x != 0:
+                        entries[(a, col)] = x
+                col += 1
+        K = sparse_right_kernel_matrix(
+            R, Vdim, col, entries, algorithm=self._space_algorithm
+        )
         cycles = ambient.submodule([ambient(list(o)) for o in K.rows()])
         boundaries = []
         for r in G.get_relation_words():
@@ -254,10 +282,20 @@ class HomologyGroup(Module, UniqueRepresentation):
             self.coefficient_module(),
         )
 
+    @lazy_attribute
+    def _twisted_fox_program(self):
+        return FoxGradientProgram(
+            self.get_gen_pow, self.get_twisted_fox_term, twisted=True
+        )
+
     def twisted_fox_gradient(self, word, red=None):
         if red is None:
-            red = lambda x: x
-        V = self.coefficient_module()
+            # Use the compiled program, which shares common subproducts
+            zero = self._gen_pows[0][0].parent()(0)
+            ans = self._twisted_fox_program.gradient(
+                tietze_to_syllables(word), zero, len(self.group().gens())
+            )
+            return [a if a is zero else a.change_ring(ZZ) for a in ans]
         h = self.get_gen_pow(0, 0, red)
         ans = [self._gen_pows[0][0].parent()(0) for o in self.group().gens()]
         if len(word) == 0:
@@ -273,46 +311,57 @@ class HomologyGroup(Module, UniqueRepresentation):
             ans[i] = ans[i].change_ring(ZZ)
         return ans
 
+    default_power_cache_size = 2**10
+
+    @lazy_attribute
+    def _power_cache(self):
+        return LRUCache(self.default_power_cache_size)
+
+    def set_power_cache_size(self, cache_size):
+        r"""
+        Change the number of powers and Fox terms of the generators which are
+        kept in the cache.
+        """
+        self._power_cache.set_maxsize(cache_size)
+
     def get_gen_pow(self, i, a, red=None):
-        if red is None:
-            red = lambda x: x
         if a == 0:
             return self._gen_pows[0][0]
         elif a > 0:
             genpows = self._gen_pows[i]
+            key = (i, 1)
         else:
             genpows = self._gen_pows_neg[i]
+            key = (i, -1)
             a = -a
-        while len(genpows) <= a:
-            tmp = genpows[1] * genpows[-1]
-            genpows.append(red(tmp))
-        return genpows[a]
+        return cached_power(self._power_cache, key, genpows[1], a, genpows[0], red)
+
+    @cached_method
+    def _inverse_gen_matrix(self, i, sign):
+        genpows = self._gen_pows[i] if sign > 0 else self._gen_pows_neg[i]
+        return genpows[1] ** -1
 
     def get_twisted_fox_term(self, i, a, red=None):
         verb_level = get_verbose()
         set_verbose(0)
-        if red is None:
-            red = lambda x: x
+        one = self._gen_pows[i][0]
         if a == 1:
-            ans = self._gen_pows[i][0]
+            ans = one
         elif a == -1:
-            ans = -self._gen_pows_neg[i][1] ** -1
+            ans = -self._inverse_gen_matrix(i, -1)
         elif a > 1:
-            genpows = self._gen_pows[i]
-            ans = genpows[0] + genpows[1] ** -1
-            for o in range(a - 2):
-                ans = red(ans)
-                ans = genpows[0] + genpows[1] ** -1 * ans
-            ans = red(ans)
+            Ainv = self._inverse_gen_matrix(i, 1)
+            ans = cached_geometric_sum(
+                self._power_cache, (i, "twisted", 1), Ainv, a, one, red
+            )
         elif a < -1:
-            a = -a
-            genpows = self._gen_pows_neg[i]
-            ans = genpows[0] + genpows[1] ** -1
-            for o in range(a - 2):
+            Ainv = self._inverse_gen_matrix(i, -1)
+            ans = cached_geometric_sum(
+                self._power_cache, (i, "twisted", -1), Ainv, -a, one, red
+            )
+            ans = -Ainv * ans
+            if red is not None:
                 ans = red(ans)
-                ans = genpows[0] + genpows[1] ** -1 * ans
-            ans = -genpows[1] ** -1 * ans
-            ans = red(ans)
         set_verbose(verb_level)
         return ans
 
@@ -336,37 +385,94 @@ class ArithHomology(HomologyGroup):
             W = V
             HomologyGroup.__init__(self, group, W)
 
-    @cached_method
+    @cached_method(
+        key=lambda self, l, use_magma, g0, with_torsion, ncpus: (
+            l,
+            use_magma,
+            g0,
+            with_torsion,
+        )
+    )
     def hecke_matrix(
-        self, l, use_magma=True, g0=None, with_torsion=False
+        self, l, use_magma=True, g0=None, with_torsion=False, ncpus=1
     ):  # l can be oo
-        verb = get_verbose()
-        set_verbose(0)
-        if with_torsion:
-            dim = len(self.gens())
-            gens = self.gens()
-        else:
-            dim = self.rank()
-            gens = self.free_gens()
-        R = self.coefficient_module().base_ring()
-        M = matrix(R, dim, dim, 0)
-        coeff_dim = self.coefficient_module().dimension()
-
-        for j, cycle in enumerate(gens):
-            # Construct column j of the matrix
-            new_col = vector(
-                self.apply_hecke_operator(cycle, l, use_magma=use_magma, g0=g0)
-            )
+        r"""
+        Return the matrix of the ``l``-th Hecke operator.
+
+        The columns are computed by a pool of ``ncpus`` processes (by default
+        one, that is, sequentially; None means all the available CPUs). See
+        :meth:`hecke_matrices`.
+        """
+        return self.hecke_matrices(
+            [l], use_magma=use_magma, g0=g0, with_torsion=with_torsion, ncpus=ncpus
+        )[0]
+
+    def hecke_matrices(
+        self, llist, use_magma=True, g0=None, with_torsion=False, ncpus=1
+    ):
+        r"""
+        Return the list of the matrices of the Hecke operators at the primes
+        in ``llist``.
+
+        The Hecke representatives of each prime, and the elements `t_i` used by
+        :meth:`apply_hecke_operator`, are computed first, so that they are
+        shared by the forked workers. Then all the columns of all the matrices
+        which are not yet cached are computed by a pool of ``ncpus`` processes
+        (by default one, that is, sequentially; None means all the available
+        CPUs).
+        """
+        llist = list(llist)
+        todo = [
+            l
+            for l in llist
+            if not self.hecke_matrix.is_in_cache(l, use_magma, g0, with_torsion)
+        ]
+        if len(todo) > 0:
+            verb = get_verbose()
+            set_verbose(0)
             if with_torsion:
-                M.set_column(j, list(new_col))
+                dim = len(self.gens())
+                gens = self.gens()
             else:
-                try:
-                    invs = self.space().invariants()
-                    M.set_column(j, [o for o, a in zip(new_col, invs) if a == 0])
-                except AttributeError:
-                    M.set_column(j, list(new_col))
-        set_verbose(verb)
-        return M
+                dim = self.rank()
+                gens = self.free_gens()
+            R = self.coefficient_module().base_ring()
+            try:
+                invs = None if with_torsion else self.space().invariants()
+            except AttributeError:
+                invs = None
+            group = self.group()
+            for l in todo:
+                for g in group.get_hecke_reps(l, use_magma=use_magma):
+                    for gamma in group.gens():
+                        group.get_hecke_ti(g, gamma, l, use_magma)
+
+            def hecke_column(lj):
+                l, j = lj
+                # Construct column j of the matrix
+                new_col = vector(
+                    self.apply_hecke_operator(gens[j], l, use_magma=use_magma, g0=g0)
+                )
+                if invs is None:
+                    return list(new_col)
+                return [o for o, a in zip(new_col, invs) if a == 0]
+
+            cols = parallel_map(
+                hecke_column,
+                [(l, j) for l in todo for j in range(dim)],
+                ncpus=ncpus,
+                msg="Hecke matrix columns",
+            )
+            for k, l in enumerate(todo):
+                M = matrix(R, dim, dim, 0)
+                for j in range(dim):
+                    M.set_column(j, cols[k * dim + j])
+                self.hecke_matrix.set_cache(M, l, use_magma, g0, with_torsion)
+            set_verbose(verb)
+        return [
+            self.hecke_matrix(l, use_magma=use_magma, g0=g0, with_torsion=with_torsion)
+            for l in llist
+        ]
 
     def apply_hecke_operator(
         self, c, l, hecke_reps=None, group=None, scale=1, use_magma=True, g0=None
@@ -9,8 +9,12 @@ from operator import mul
 
 from sage.all import prod
 from sage.arith.misc import algdep
+from sage.misc.cachefunc import cached_function
+from sage.misc.lazy_attribute import lazy_attribute
 from sage.misc.misc import cputime
+from sage.misc.persist import dumps, loads
 from sage.misc.verbose import verbose
+from sage.modules.free_module_element import vector
 from sage.parallel.decorate import fork, parallel
 from sage.rings.all import (
     RR,
@@ -25,7 +29,7 @@ from sage.rings.all import (
 )
 from sage.structure.sage_object import SageObject
 
-from .limits import find_center, num_evals
+from .limits import find_center, num_evals, schedule_by_cost
 from .sarithgroup import BTEdge
 from .util import *
 
@@ -47,75 +51,281 @@ def act_on_polynomial(P, num, den, N=None):
     return ans
 
 
+class CoveringEdgeTable(SageObject):
+    r"""
+    Table of the edges of the Bruhat-Tits tree visited by
+    :func:`double_integral_zero_infty` for the modular symbol ``Phi``.
+
+    For each edge it remembers the moments of ``Phi`` (and of its liftee)
+    attached to it, so that double integrals over overlapping regions share
+    the evaluations of the modular symbol. The table of ``Phi`` is obtained
+    with :func:`covering_edge_table`.
+
+    The moments are kept in a least-recently-used cache bounded by
+    ``cache_size`` moments, whose statistics are returned by :meth:`cache_info`.
+    The distributions in which ``Phi`` takes values remember the matrix of each
+    element that acted on them. That cache is emptied whenever it holds more
+    than ``action_cache_size`` matrices.
+
+    EXAMPLES::
+
+        sage: from darmonpoints.cohomology_arithmetic import get_overconvergent_class_matrices
+        sage: from darmonpoints.integrals import covering_edge_table
+        sage: from darmonpoints.util import M2Z
+        sage: Phi = get_overconvergent_class_matrices(11, EllipticCurve('11a1'), 5, 1, use_ps_dists=True)
+        sage: T = covering_edge_table(Phi)
+        sage: T is covering_edge_table(Phi)
+        True
+        sage: e = T.initial_edges(M2Z([1, 0, 0, 1]))[0]
+        sage: len(T.children(e))
+        11
+        sage: mu = T.moments(e, 3)
+        sage: T.moments(e, 2) == mu[:2]
+        True
+        sage: T.evaluations
+        1
+    """
+
+    default_action_cache_size = 2**12
+
+    def __init__(self, Phi, cache_size=2**22, action_cache_size=None):
+        self.Phi = Phi
+        self.p = Phi.parent().prime()
+        self.level = Phi._map._manin.level()
+        self.E0inf = [M2Z([0, -1, self.level, 0])]
+        self.E0Zp = [M2Z([self.p, a, 0, 1]) for a in range(self.p)]
+        self._moments = LRUCache(cache_size, weight=len)
+        if action_cache_size is None:
+            action_cache_size = self.default_action_cache_size
+        self._action_cache_size = action_cache_size
+        self.evaluations = 0
+
+    def set_cache_size(self, cache_size):
+        r"""
+        Change the bound of the cache of moments (None means no bound).
+        """
+        self._moments.set_maxsize(cache_size)
+
+    def _bound_action_cache(self, V):
+        r"""
+        Empty the cache of acting matrices of the distributions ``V`` if it
+        holds more than ``self._action_cache_size`` matrices.
+        """
+        if len(V._act._actmat) > self._action_cache_size:
+            V.clear_cache()
+
+    def cache_info(self):
+        r"""
+        Return the statistics of the cache of moments.
+        """
+        return self._moments.info()
+
+    def initial_edges(self, h):
+        r"""
+        Return the edges covering the affinoid with center ``h``.
+        """
+        return [h * e0 for e0 in self.E0Zp + self.E0inf]
+
+    def children(self, e):
+        r"""
+        Return the edges into which ``e`` is subdivided.
+        """
+        return [e * e0 for e0 in self.E0Zp]
+
+    def moments(self, e, n):
+        r"""
+        Return the list of the first ``n`` moments of ``Phi`` at ``e`` (as
+        integers), where the moment `0` is taken from the liftee of ``Phi``.
+        """
+        key = tuple(e.list())
+        try:
+            ans = self._moments[key]
+            if len(ans) >= n:
+                return ans[:n]
+        except KeyError:
+            pass
+        self._bound_action_cache(self.Phi._map._codomain)
+        self._bound_action_cache(self.Phi._liftee._map._codomain)
+        a, b, c, d = e.list()
+        try:
+            phimap = self.Phi._map(M2Z([b, d, a, c]))
+        except OverflowError:
+            raise OverflowError(
+                "Matrix too large? (entries %s, %s, %s, %s)" % (a, b, c, d)
+            )
+        # mu_e0 = ZZ(phimap.moment(0).rational_reconstruction())
+        mu_e0 = ZZ(self.Phi._liftee._map(M2Z([b, d, a, c])).moment(0))
+        ans = [mu_e0] + [phimap.moment(o).lift() for o in range(1, n)]
+        self._moments[key] = ans
+        self.evaluations += 1
+        return ans
+
+
+def covering_edge_table(Phi, cache_size=None):
+    r"""
+    Return the :class:`CoveringEdgeTable` attached to ``Phi``, creating it if needed.
+
+    If ``cache_size`` is given, it becomes the bound of the caches of the table.
+    """
+    try:
+        table = Phi._covering_edge_table
+    except AttributeError:
+        table = CoveringEdgeTable(Phi)
+        Phi._covering_edge_table = table
+    if cache_size is not None:
+        table.set_cache_size(cache_size)
+    return table
+
+
+def _edge_expansion(f, e, r1, p):
+    r"""
+    Return a pair ``(val, V)`` such that `\log f` restricted to the open set
+    attached to the edge ``e`` is ``log(val)`` plus the power series with
+    coefficients ``V``, or None if ``e`` needs to be subdivided.
+    """
+    a, b, c, d = e.list()
+    try:
+        y0 = f((a * r1 + b) / (c * r1 + d))
+        val = y0(y0.parent().base_ring()(0))
+        if not all([xx.valuation(p) > 0 for xx in (y0 / val - 1).list()]):
+            return None
+        pol = val.log(p_branch=0) + ((y0.derivative() / y0).integral())
+    except ZeroDivisionError:
+        # raise RuntimeError('Probably not enough working precision...')
+        return None
+    V = [0] * pol.valuation() + pol.shift(-pol.valuation()).list()
+    return val, V
+
+
 def double_integral_zero_infty(Phi, tau1, tau2):
+    return double_integral_many(Phi, [(tau1, tau2)])[0]
+
+
+def double_integral_many(Phi, pairs, return_evals=False):
+    r"""
+    Return the list of the values ``double_integral_zero_infty(Phi, tau1, tau2)``
+    for ``(tau1, tau2)`` in ``pairs``.
+
+    The coverings of all the pairs are traversed together, so that each edge is
+    visited once and the moments of ``Phi`` at it are shared by all the pairs
+    whose local expansion is valid there.
+
+    If ``return_evals`` is True, also return the list of the number of edges
+    which contributed to each integral.
+
+    EXAMPLES::
+
+        sage: from darmonpoints.cohomology_arithmetic import get_overconvergent_class_matrices
+        sage: from darmonpoints.integrals import double_integral_many, double_integral_zero_infty
+        sage: Phi = get_overconvergent_class_matrices(11, EllipticCurve('11a1'), 5, 1, use_ps_dists=True)
+        sage: K.<a> = Qq(11^2, 5)
+        sage: pairs = [(a, a + 1), (a, 2 * a)]
+        sage: vals, evals = double_integral_many(Phi, pairs, return_evals=True)
+        sage: vals == [double_integral_zero_infty(Phi, t1, t2) for t1, t2 in pairs]
+        True
+        sage: all(n > 0 for n in evals)
+        True
+    """
+    pairs = list(pairs)
     p = Phi.parent().prime()
-    K = tau1.parent()
-    R = PolynomialRing(K, "x")
-    x = R.gen()
-    Phi_liftee = Phi._liftee
     try:
         prec = Phi.precision_absolute()
     except AttributeError:
         prec = Phi.precision_relative()
-    R1 = PowerSeriesRing(K, "r1", default_prec=prec)
-    r1 = R1.gen()
-    level = Phi._map._manin.level()
-    E0inf = [M2Z([0, -1, level, 0])]
-    E0Zp = [M2Z([p, a, 0, 1]) for a in range(p)]
+    table = covering_edge_table(Phi)
+    level = table.level
 
-    predicted_evals = num_evals(tau1, tau2)
+    predicted_evals = sum(num_evals(tau1, tau2) for tau1, tau2 in pairs)
 
-    a, b, c, d = find_center(p, level, tau1, tau2).list()
-    h = M2Z([a, b, c, d])
-    E = [h * e0 for e0 in E0Zp + E0inf]
+    # E maps the key of each edge to the edge and the indices of the pairs visiting it
+    E = {}
+    fdata = []
+    for i, (tau1, tau2) in enumerate(pairs):
+        K = tau1.parent()
+        x = PolynomialRing(K, "x").gen()
+        r1 = PowerSeriesRing(K, "r1", default_prec=prec).gen()
+        fdata.append(((x - tau2) / (x - tau1), r1))
+        a, b, c, d = find_center(p, level, tau1, tau2).list()
+        h = M2Z([a, b, c, d])
+        for e in table.initial_edges(h):
+            E.setdefault(tuple(e.list()), (e, []))[1].append(i)
 
-    resadd = 0
-    resmul = 1
+    resadd = [0 for _ in pairs]
+    resmul = [1 for _ in pairs]
+    evals = [0 for _ in pairs]
     total_evals = 0
-    percentage = QQ(0)
-    ii = 0
-    f = (x - tau2) / (x - tau1)
     while len(E) > 0:
-        ii += 1
-        increment = QQ((100 - percentage) / len(E))
         verbose(
-            "remaining %s percent (and done %s of %s evaluations)"
-            % (RealField(10)(100 - percentage), total_evals, predicted_evals)
+            "visiting %s edges (and done %s of %s evaluations)"
+            % (len(E), total_evals, predicted_evals)
         )
-        newE = []
-        for e in E:
-            a, b, c, d = e.list()
-            assert ZZ(c) % level == 0
-            try:
-                y0 = f((a * r1 + b) / (c * r1 + d))
-                val = y0(y0.parent().base_ring()(0))
-                if all([xx.valuation(p) > 0 for xx in (y0 / val - 1).list()]):
-                    if total_evals % 100 == 0:
-                        Phi._map._codomain.clear_cache()
-                    pol = val.log(p_branch=0) + ((y0.derivative() / y0).integral())
-                    V = [0] * pol.valuation() + pol.shift(-pol.valuation()).list()
-
-                    try:
-                        phimap = Phi._map(M2Z([b, d, a, c]))
-                    except OverflowError:
-                        print(a, b, c, d)
-                        raise OverflowError("Matrix too large?")
-                    # mu_e0 = ZZ(phimap.moment(0).rational_reconstruction())
-                    mu_e0 = ZZ(Phi_liftee._map(M2Z([b, d, a, c])).moment(0))
-                    mu_e = [mu_e0] + [phimap.moment(o).lift() for o in range(1, len(V))]
-                    resadd += sum(starmap(mul, zip(V, mu_e)))
-                    resmul *= val**mu_e0
-                    percentage += increment
-                    total_evals += 1
-                else:
-                    newE.extend([e * e0 for e0 in E0Zp])
-            except ZeroDivisionError:
-                # raise RuntimeError('Probably not enough working precision...')
-                newE.extend([e * e0 for e0 in E0Zp])
+        newE = {}
+        for e, indices in E.values():
+            assert ZZ(e[1, 0]) % level == 0
+            for i in indices:
+                f, r1 = fdata[i]
+                expansion = _edge_expansion(f, e, r1, p)
+                if expansion is None:
+                    for e1 in table.children(e):
+                        newE.setdefault(tuple(e1.list()), (e1, []))[1].append(i)
+                    continue
+                val, V = expansion
+                mu_e = table.moments(e, len(V))
+                resadd[i] += sum(starmap(mul, zip(V, mu_e)))
+                resmul[i] *= val ** mu_e[0]
+                evals[i] += 1
+                total_evals += 1
         E = newE
-    verbose("total evaluations = %s" % total_evals)
-    val = resmul.valuation()
-    return p**val * K.teichmuller(p ** (-val) * resmul) * resadd.exp()
+    verbose(
+        "total evaluations = %s (%s modular symbol evaluations so far, cache: %s)"
+        % (total_evals, table.evaluations, table.cache_info())
+    )
+    ans = []
+    for (tau1, tau2), add, mult in zip(pairs, resadd, resmul):
+        K = tau1.parent()
+        val = mult.valuation()
+        ans.append(p**val * K.teichmuller(p ** (-val) * mult) * add.exp())
+    if return_evals:
+        return ans, evals
+    return ans
+
+
+def double_integral_scheduled(Phi, pairs, ncpus=1):
+    r"""
+    Return the list of the values ``double_integral_zero_infty(Phi, tau1, tau2)``
+    for ``(tau1, tau2)`` in ``pairs``, together with a report.
+
+    The integrals are distributed among ``ncpus`` processes (all the available
+    CPUs, if ``ncpus`` is None) by :func:`darmonpoints.limits.schedule_by_cost`,
+    using the number of evaluations predicted by
+    :func:`darmonpoints.limits.num_evals`. Each process computes its integrals
+    with :func:`double_integral_many`.
+
+    The report is a list with, for each pair, a dictionary with keys
+    ``'predicted'`` and ``'actual'`` (number of evaluations) and ``'worker'``.
+    """
+    pairs = list(pairs)
+    nworkers = available_ncpus() if ncpus is None else ncpus
+    predicted = [num_evals(t1, t2) for t1, t2 in pairs]
+    bins, loads = schedule_by_cost(predicted, nworkers)
+    bins = [o for o in bins if len(o) > 0]
+    verbose("Predicted evaluations per worker: %s" % loads)
+    results = parallel_map(
+        lambda idx: double_integral_many(
+            Phi, [pairs[i] for i in idx], return_evals=True
+        ),
+        bins,
+        ncpus=nworkers,
+        chunksize=1,
+        msg="Double integrals",
+    )
+    ans = [None for _ in pairs]
+    report = [None for _ in pairs]
+    for worker, (idx, (vals, evals)) in enumerate(zip(bins, results)):
+        for i, v, n in zip(idx, vals, evals):
+            ans[i] = v
+            report[i] = {"predicted": predicted[i], "actual": n, "worker": worker}
+    return ans, report
 
 
 ##----------------------------------------------------------------------------
@@ -168,56 +378,136 @@ def double_integral(Phi, tau1, tau2, r, s):
         return i1 / i2
 
 
-def log_pseries(R, x, prec=None):
+@cached_function
+def log_kernel(K, prec):
     r"""
-    Calculate efficiently log(1 - x*z), where z is the variable of R
-    Doing it with power series built-in log is about 10 times slower...
+    Return the list ``[0, 1, 1/2, ..., 1/prec]`` of elements of ``K``, used to
+    expand `\log(1 - xz)` up to degree ``prec``.
+    """
+    return [K.zero()] + [K(QQ(1) / QQ(m)) for m in range(1, prec + 1)]
+
+
+def log_pseries_divisor(R, points, prec=None):
+    r"""
+    Calculate `\sum_i n_i \log(1 - x_i z)`, where z is the variable of R, for
+    the list ``points`` of pairs `(x_i, n_i)`.
+
+    The power sums `\sum_i n_i x_i^m` are accumulated first, so that the
+    coefficients `1/m` are applied only once per degree. Doing it with power
+    series built-in log is about 10 times slower...
     """
-    if x.valuation() <= 0:
-        raise ValueError("Valuation problem")
     K = R.base_ring()
     if prec is None:
         prec = R.default_precision()
-    v = [K.zero(), K(x)]
-    xpow = K(x)
-    for m in range(2, prec + 1):
-        xpow *= x
-        v.append(xpow / QQ(m))
-    return -R(v)
+    xs = [K(x) for x, n in points]
+    ns = [QQ(n) for x, n in points]
+    if any(x.valuation() <= 0 for x in xs):
+        raise ValueError("Valuation problem")
+    inv = log_kernel(K, prec)
+    v = [K.zero()]
+    xpows = [K.one() for x in xs]
+    for m in range(1, prec + 1):
+        xpows = [u * x for u, x in zip(xpows, xs)]
+        v.append(-sum((n * u for n, u in zip(ns, xpows)), K.zero()) * inv[m])
+    return R(v)
+
+
+def log_pseries(R, x, prec=None):
+    r"""
+    Calculate `\log(1 - xz)`, where z is the variable of R.
+
+    EXAMPLES::
+
+        sage: from darmonpoints.integrals import log_pseries, log_pseries_divisor
+        sage: K = Qp(5, 10)
+        sage: R.<z> = PolynomialRing(K)
+        sage: log_pseries(R, K(5), 6) == log_pseries_divisor(R, [(K(5), 1)], 6)
+        True
+    """
+    return log_pseries_divisor(R, [(x, 1)], prec)
+
+
+def log_pseries_fractional(R, points, abcd, prec=None):
+    r"""
+    Calculate `\sum_i n_i \log(-(aP_i+b) + (cP_i+d)z)` on an edge `(a,b,c,d)`,
+    where z is the variable of R, for the list ``points`` of pairs `(P_i, n_i)`.
+
+    The substitution `x_i = (cP_i+d)/(aP_i+b)` and the constant term are
+    computed in the same pass over ``points``, and the series part is
+    `\sum_i n_i \log(1 - x_i z)`, as in :func:`log_pseries_divisor`.
+
+    Return the triple ``(pol, c0val, c0unit)``, where `\sum_i n_i v(aP_i+b)`
+    is ``c0val`` and `\prod_i u(-(aP_i+b))^{n_i}` is ``c0unit`` (`u` being the
+    unit part), and ``pol`` includes `\log` of ``c0unit``. Return None if
+    some `x_i` does not have positive valuation.
+
+    EXAMPLES::
+
+        sage: from darmonpoints.integrals import log_pseries_divisor, log_pseries_fractional
+        sage: K = Qp(5, 10)
+        sage: R.<z> = PolynomialRing(K)
+        sage: points = [(K(1), 1), (K(2), -1)]
+        sage: pol, c0val, c0unit = log_pseries_fractional(R, points, (K(1), K(0), K(5), K(0)), 6)
+        sage: pol == log_pseries_divisor(R, [(K(5), 1), (K(5), -1)], 6) + c0unit.log(0)
+        True
+        sage: log_pseries_fractional(R, points, (K(5), K(0), K(1), K(0)), 6) is None
+        True
+    """
+    a, b, c, d = abcd
+    K = R.base_ring()
+    xs = []
+    c0unit = K.one()
+    c0val = 0
+    for P, n in points:
+        hp0 = a * P + b
+        if hp0 == 0:
+            return None
+        x = (c * P + d) / hp0
+        if x.valuation() <= 0:
+            return None
+        xs.append((x, n))
+        c0unit *= (-hp0).unit_part() ** n
+        c0val += n * hp0.valuation()
+    pol = log_pseries_divisor(R, xs, prec) + c0unit.log(0)
+    return pol, c0val, c0unit
 
 
-def lift_to_locally_analytic(G, divisor, prec=None, depth=1):
+def lift_to_locally_analytic(G, divisor, prec=None, depth=1, stats=None):
+    r"""
+    Yield, for each edge of a covering of `\mathbb{P}^1(\QQ_p)` adapted to
+    ``divisor``, the expansion of `\log` of the rational function with divisor
+    ``divisor`` on the corresponding open set.
+
+    On each edge `(a,b,c,d)` the expansion is computed by
+    :func:`log_pseries_fractional`. It exists only if `v(cP+d) > v(aP+b)` for
+    all the points `P` in the support of ``divisor``. Otherwise the edge is
+    subdivided (two levels at a time). If
+    ``stats`` is a dictionary, then ``stats[n]`` is set to the number of edges of
+    depth ``n`` which have been yielded.
+    """
     if depth % 2 != 1:
         raise NotImplementedError("Need to allow for reversed edges.")
     K = divisor.parent().base_ring()
     if prec is None:
         prec = K.precision_cap()
+    if stats is None:
+        stats = {}
     p = G.p
     R = PolynomialRing(K, "r")
     wplocinv = G.wp
     edgelist = [
         ((-1) ** (depth + 1), o, QQ(1) / QQ(p + 1)) for o in G.get_covering(depth)
     ]
+    points = [(K(P), n) for P, n in divisor]
+    current_depth = depth
     while len(edgelist) > 0:
         newedgelist = []
-        ii = 0
+        stats[current_depth] = 0
         for parity, (rev, h), wt in edgelist:
-            ii += 1
             assert not rev  # TODO: allow for reversed edges as well
-            a, b, c, d = (K(o) for o in G.embed(h, prec).list())
-            try:
-                c0unit = K.one()
-                c0val = 0
-                pol = R.zero()
-                for P, n in divisor:
-                    hp0 = K(a * P + b)
-                    pol += QQ(n) * log_pseries(R, K(c * P + d) / hp0, prec)
-                    c0unit *= (-hp0).unit_part() ** n
-                    c0val += n * hp0.valuation()
-                pol += c0unit.log(0)
-                yield ((h, rev), pol, c0val, c0unit)
-            except ValueError as msg:
-                verbose("Subdividing because (%s)..." % str(msg))
+            abcd = [K(o) for o in G.embed(h, prec).list()]
+            ans = log_pseries_fractional(R, points, abcd, prec)
+            if ans is None:
                 newedgelist.extend(
                     [
                         ((-1) ** 2 * parity, o, wt / QQ(p**2))
@@ -225,9 +515,45 @@ def lift_to_locally_analytic(G, divisor, prec=None, depth=1):
                     ]
                 )
                 continue
+            pol, c0val, c0unit = ans
+            stats[current_depth] += 1
+            yield ((h, rev), pol, c0val, c0unit)
+        verbose(
+            "%s edges at depth %s, subdividing %s"
+            % (stats[current_depth], current_depth, len(newedgelist) // p**2)
+        )
+        current_depth += 2
         edgelist = newedgelist
 
 
+def _moment_pairing(coefficients, moments, K):
+    r"""
+    Return `\sum_i a_i \mu_i`, where ``coefficients`` and ``moments`` are the
+    lists of the `a_i` and the `\mu_i`, computed as a single dot product over ``K``.
+    """
+    if len(coefficients) == 0:
+        return K(0)
+    return vector(K, coefficients) * vector(K, moments)
+
+
+def _power_pairings(moments, base, J, K):
+    r"""
+    Return the list of the pairings of ``base**j`` with the distribution whose
+    moments are ``moments``, for `0 \le j \le` ``J``.
+
+    The powers of the power series ``base`` are computed incrementally, and
+    each of them is paired with :func:`_moment_pairing`.
+    """
+    ans = []
+    power = base.parent()(1)
+    for j in range(J + 1):
+        pol = power.polynomial()
+        n = min(len(moments), pol.degree() + 1)
+        ans.append(_moment_pairing(pol.padded_list(n), moments[:n], K))
+        power *= base
+    return ans
+
+
 r"""
 Integration pairing. The input is a cycle (an element of `H_1(G,\text{Div}^0)`)
 and a cocycle (an element of `H^1(G,\text{HC}(\ZZ))`).
@@ -245,7 +571,15 @@ def integrate_H1(
     progress_bar=False,
     multiplicative=True,
     return_valuation=True,
+    ncpus=1,
 ):
+    r"""
+    Integrate ``cocycle`` against the cycle ``cycle``.
+
+    The elements of the support of ``cycle`` are distributed among ``ncpus``
+    processes (all the available CPUs, if ``ncpus`` is None), and their
+    contributions are combined at the end.
+    """
     if not cycle.is_degree_zero_valued():
         raise ValueError("Cycle should take values in divisors of degree 0")
     if prec is None:
@@ -256,30 +590,44 @@ def integrate_H1(
     t = R.gen()
     total_integrals = cycle.size_of_support()
     verbose("Will do %s integrals" % total_integrals)
-    resmul = Cp(1)
-    resadd = Cp(0)
-    resval = ZZ(0)
-    for g, D in cycle:
+
+    def integrate_term(gD):
+        g, D = gD
+        resmul = Cp(1)
+        resadd = Cp(0)
+        resval = ZZ(0)
         if twist:
             D = D.left_act_by_matrix(G.embed(G.wp(), prec).change_ring(Cp))
             g = g.conjugate_by(G.wp() ** -1)
+        # Coefficients and moments of the edges, according to their orientation
+        coeffs = ([], [])
+        moments = ([], [])
         for (h, rev), pol, c0val, c0unit in lift_to_locally_analytic(G, D, prec, depth):
-            mu = cocycle.evaluate(g, h, at_identity=G.use_shapiro())
-            mu0 = cocycle["liftee"].evaluate(g, h, at_identity=G.use_shapiro())[0]
-            newresadd = sum(
-                a * mu.moment(i)
-                for a, i in zip(pol.coefficients(), pol.exponents())
-                if i < len(mu.moments())
-            )
-            newresval = c0val * ZZ(mu0)
-            newresmul = c0unit ** ZZ(mu0)
+            mu, mu0 = cocycle.evaluate_with_liftee(g, h, at_identity=G.use_shapiro())
+            mu0 = ZZ(mu0)
+            n = min(len(mu.moments()), pol.degree() + 1)
+            coeffs[int(rev)].extend(pol.padded_list(n))
+            moments[int(rev)].extend(mu.moment(i) for i in range(n))
             if rev:
-                newresadd = -newresadd
-                newresval = -newresval
-                newresmul = newresmul**-1
-            resadd += newresadd
-            resval += newresval
-            resmul *= newresmul
+                resval -= c0val * mu0
+                resmul *= c0unit**-mu0
+            else:
+                resval += c0val * mu0
+                resmul *= c0unit**mu0
+        resadd += _moment_pairing(coeffs[0], moments[0], Cp)
+        resadd -= _moment_pairing(coeffs[1], moments[1], Cp)
+        return resadd, resval, resmul
+
+    terms = parallel_map(
+        integrate_term,
+        list(cycle),
+        ncpus=ncpus,
+        progress_bar=progress_bar,
+        msg="Integration",
+    )
+    resadd = sum((o[0] for o in terms), Cp(0))
+    resval = sum((o[1] for o in terms), ZZ(0))
+    resmul = prod((o[2] for o in terms), Cp(1))
     if not multiplicative:
         return resadd, resval, resmul if return_valuation else resadd
     else:
@@ -287,44 +635,71 @@ def integrate_H1(
 
 
 def integrate_H1_riemann(
-    G, cycle, cocycle, depth, prec=None, twist=False, progress_bar=False
+    G, cycle, cocycle, depth, prec=None, twist=False, progress_bar=False, ncpus=1
 ):
+    r"""
+    Integrate ``cocycle`` against ``cycle`` using Riemann sums over the covering
+    of depth ``depth``.
+
+    The covering is walked only once, evaluating all the components of the cycle
+    at each edge. The edges are distributed among ``ncpus`` processes (all the
+    available CPUs, if ``ncpus`` is None).
+    """
     if not cycle.is_degree_zero_valued():
         raise ValueError("Cycle should take values in divisors of degree 0")
     if prec is None:
         prec = cocycle.parent().coefficient_module().base_ring().precision_cap()
     verbose("precision = %s" % prec)
     Cp = cycle.parent().coefficient_module().base()
-    R = PolynomialRing(Cp, names="t")
-    t = R.gen()
     total_integrals = cycle.size_of_support()
     verbose("Will do %s integrals" % total_integrals)
-    R = PolynomialRing(Cp, names="t").fraction_field()
-    t = R.gen()
-    resmul = Cp(1)
-    resadd = Cp(0)
-    resval = ZZ(0)
     try:
         cocycle = cocycle["liftee"]
     except KeyError:
         pass
+    components = []
     for g, D in cycle:
         if twist:
             D = D.left_act_by_matrix(G.embed(G.wp(), prec).change_ring(Cp))
             g = g.conjugate_by(G.wp() ** -1)
-        phiD = lambda t: prod([(t - P) ** ZZ(n) for P, n in D], Cp(1))
-        resmul *= Cp(
-            riemann_sum(
-                G,
-                phiD,
-                ShapiroImage(G, cocycle)(g.quaternion_rep),
-                depth,
-                mult=True,
-                progress_bar=progress_bar,
-                K=Cp,
-            )
+        components.append(
+            ([(P, ZZ(n)) for P, n in D], ShapiroImage(G, cocycle)(g.quaternion_rep))
         )
-    return resmul
+    sprec = max([20, 2 * depth])
+    cover = sample_point_table(G, depth, sprec)
+
+    def riemann_chunk(chunk):
+        res = Cp(1)
+        for entry in chunk:
+            hces = [
+                (D, _hc_integer_value(hc(entry[0], hl=entry[1])))
+                for D, hc in components
+            ]
+            if all(hce == 0 for D, hce in hces):
+                continue
+            te = table_sample_point(G, entry, sprec)
+            if te == Infinity:
+                continue
+            x = Cp(te)
+            for D, hce in hces:
+                if hce != 0:
+                    res *= prod([(x - P) ** n for P, n in D], Cp(1)) ** hce
+        return res
+
+    if ncpus is None:
+        ncpus = available_ncpus()
+    nchunks = 4 * ncpus
+    chunksize = max(1, -(-len(cover) // nchunks))
+    chunks = [cover[i : i + chunksize] for i in range(0, len(cover), chunksize)]
+    partial = parallel_map(
+        riemann_chunk,
+        chunks,
+        ncpus=ncpus,
+        chunksize=1,
+        progress_bar=progress_bar,
+        msg="Riemann sum",
+    )
+    return prod(partial, Cp(1))
 
 
 def sample_point(G, e, prec=20):
@@ -342,6 +717,57 @@ def sample_point(G, e, prec=20):
     return b / d
 
 
+def sample_point_table(G, depth, prec=20, cache_size=2**20):
+    r"""
+    Return the table of the edges ``e`` in ``G.get_covering(depth)``, as a list
+    of entries ``[e, el, te]``. Here ``el`` is the embedding of the element of
+    ``e`` used to reduce it in the amalgam, and ``te`` is the sample point of
+    ``e``, which is computed by :func:`table_sample_point` the first time it is
+    needed (it is None until then).
+
+    The tables are stored in ``G``, in a cache which keeps at most ``cache_size``
+    edges (the least recently used tables are discarded first).
+
+    EXAMPLES::
+
+        sage: from darmonpoints.sarithgroup import BigArithGroup
+        sage: from darmonpoints.integrals import sample_point, sample_point_table, table_sample_point
+        sage: G = BigArithGroup(11, 1, 1, use_shapiro=False, outfile='/dev/null')
+        sage: T = sample_point_table(G, 2)
+        sage: T is sample_point_table(G, 2)
+        True
+        sage: e, el, te = T[3]
+        sage: el == G.embed(e.gamma, G.amalgam_prec)
+        True
+        sage: table_sample_point(G, T[3], 20) == sample_point(G, e, 20)
+        True
+    """
+    try:
+        tables = G._sample_point_tables
+    except AttributeError:
+        tables = G._sample_point_tables = LRUCache(cache_size, weight=len)
+    try:
+        return tables[depth, prec]
+    except KeyError:
+        pass
+    ans = []
+    for e in G.get_covering(depth):
+        rev, h = e
+        ans.append([e, G.embed(h, G.amalgam_prec), None])
+    tables[depth, prec] = ans
+    return ans
+
+
+def table_sample_point(G, entry, prec):
+    r"""
+    Return the sample point of the entry ``entry`` of a table returned by
+    :func:`sample_point_table` with precision ``prec``, storing it in the entry.
+    """
+    if entry[2] is None:
+        entry[2] = sample_point(G, entry[0], prec)
+    return entry[2]
+
+
 def get_basic_integral(G, cocycle, gamma, center, j, prec=None):
     p = G.p
     HOC = cocycle.parent()
@@ -364,7 +790,7 @@ def get_basic_integral(G, cocycle, gamma, center, j, prec=None):
     resadd = ZZ(0)
     edgelist = G.get_covering(1)[1:]
     for rev, h in edgelist:
-        mu_e = cycle.evaluate(gamma, h, twist=rev, at_identity=G.use_shapiro())
+        mu_e = cocycle.evaluate(gamma, h, twist=rev, at_identity=G.use_shapiro())
         a, b, c, d = (Cp(o) for o in G.embed(h, prec).list())
         pol = (
             (PS(d * z + b) / PS(c * z + a) - Cp.teichmuller(center)) ** j
@@ -377,6 +803,51 @@ def get_basic_integral(G, cocycle, gamma, center, j, prec=None):
     return resadd
 
 
+def get_basic_integrals(G, cocycle, gamma, center, J, prec=None):
+    r"""
+    Return the list of ``get_basic_integral(G, cocycle, gamma, center, j, prec)``
+    for `0 \le j \le` ``J``.
+
+    The cocycle is evaluated only once at each edge, and the powers of the
+    local expansion are computed incrementally.
+
+    EXAMPLES::
+
+        sage: from darmonpoints.sarithgroup import BigArithGroup
+        sage: from darmonpoints.cohomology_arithmetic import *
+        sage: from darmonpoints.integrals import get_basic_integral, get_basic_integrals
+        sage: G = BigArithGroup(11, 1, 1, use_shapiro=False, outfile='/dev/null')
+        sage: Coh = ArithCoh(G)
+        sage: phiE = get_cocycle_from_elliptic_curve(Coh, EllipticCurve('11a1'), use_magma=False)
+        sage: Phi = get_overconvergent_class_quaternionic(11, phiE, G, 6, 1, 1)
+        sage: gamma = G.large_group().gen(0)
+        sage: ints = get_basic_integrals(G, Phi, gamma, 1, 3)
+        sage: ints == [get_basic_integral(G, Phi, gamma, 1, j) for j in range(4)]
+        True
+    """
+    p = G.p
+    HOC = cocycle.parent()
+    V = HOC.coefficient_module()
+
+    if prec is None:
+        prec = V.precision_cap()
+    Cp = Qp(p, prec)
+    verbose("precision = %s" % prec)
+    PS = PowerSeriesRing(Cp, names="z")
+    z = PS.gen()
+    tc = Cp.teichmuller(center)
+    resadd = [ZZ(0) for j in range(J + 1)]
+    edgelist = G.get_covering(1)[1:]
+    for rev, h in edgelist:
+        mu_e = cocycle.evaluate(gamma, h, twist=rev, at_identity=G.use_shapiro())
+        moments = [mu_e.moment(i) for i in range(len(mu_e.moments()))]
+        a, b, c, d = (Cp(o) for o in G.embed(h, prec).list())
+        base = PS(d * z + b) / PS(c * z + a) - tc
+        for j, val in enumerate(_power_pairings(moments, base, J, Cp)):
+            resadd[j] += val
+    return resadd
+
+
 class ShapiroImage(SageObject):
     def __init__(self, G, cocycle):
         self.G = G
@@ -392,11 +863,22 @@ class CoinducedElement(SageObject):
         self.cocycle = cocycle
         self.gamma = gamma
 
-    def __call__(self, h, check=False):
+    @lazy_attribute
+    def _gamma_local(self):
+        return self.G.embed(self.gamma, self.G.amalgam_prec)
+
+    def __call__(self, h, check=False, hl=None):
+        r"""
+        Evaluate at the edge ``h``. If given, ``hl`` is the embedding of the
+        element of ``h`` tabulated by :func:`sample_point_table`.
+        """
         rev, b = h
         if check:
             assert self.G.reduce_in_amalgam(b) == 1
-        a = self.G.reduce_in_amalgam(b * self.gamma)
+        if hl is None:
+            a = self.G.reduce_in_amalgam(b * self.gamma)
+        else:
+            a = self.G.reduce_in_amalgam(b * self.gamma, xl=hl * self._gamma_local)
         if self.G.use_shapiro():
             ans = self.cocycle.evaluate_and_identity(a)
         else:
@@ -412,31 +894,70 @@ Integration pairing of a function with an harmonic cocycle.
 """
 
 
-def riemann_sum(G, phi, hc, depth=1, mult=False, progress_bar=False, K=None):
+def _hc_integer_value(val):
+    vmom = val[0]  # .moment(0)
+    if vmom.parent().is_exact():
+        return ZZ(vmom)
+    else:
+        return ZZ(vmom.rational_reconstruction())
+
+
+def riemann_sum(
+    G,
+    phi,
+    hc,
+    depth=1,
+    mult=False,
+    progress_bar=False,
+    K=None,
+    stream=False,
+    checkpoint=None,
+    checkpoint_interval=10000,
+):
+    r"""
+    Riemann sum of ``phi`` against the harmonic cocycle ``hc``, over the covering
+    of depth ``depth``.
+
+    The sample points of the covering are taken from :func:`sample_point_table`.
+
+    If ``stream`` is True or ``checkpoint`` is given, the edges are instead
+    generated one at a time and nothing is stored (see :func:`riemann_sum_streaming`).
+    """
+    if stream or checkpoint is not None:
+        return riemann_sum_streaming(
+            G,
+            phi,
+            hc,
+            depth,
+            mult,
+            progress_bar,
+            K,
+            checkpoint,
+            checkpoint_interval,
+        )
     prec = max([20, 2 * depth])
     res = 1 if mult else 0
     if K is None:
         K = phi.parent().base_ring()
-    cover = G.get_covering(depth)
+    cover = sample_point_table(G, depth, prec)
+    if isinstance(hc, CoinducedElement):
+        hc_at = lambda entry: hc(entry[0], hl=entry[1])
+    else:
+        hc_at = lambda entry: hc(entry[0])
     n_ints = 0
-    for e in cover:
+    for entry in cover:
         if n_ints % 500 == 499:
             verbose("Done %s percent" % (100 * RealField(10)(n_ints) / len(cover)))
         if progress_bar:
             update_progress(
                 float(RealField(10)(n_ints + 1) / len(cover)), "Riemann sum"
             )
+        hce = _hc_integer_value(hc_at(entry))
         n_ints += 1
-        val = hc(e)
-        vmom = val[0]  # .moment(0)
-        if vmom.parent().is_exact():
-            hce = ZZ(vmom)
-        else:
-            hce = ZZ(vmom.rational_reconstruction())
         if hce == 0:
             continue
         # verbose('hc = %s'%hce)
-        te = sample_point(G, e, prec)
+        te = table_sample_point(G, entry, prec)
         if te == Infinity:
             continue
         if mult:
@@ -444,3 +965,125 @@ def riemann_sum(G, phi, hc, depth=1, mult=False, progress_bar=False, K=None):
         else:
             res += phi(K(te)) * hce
     return res
+
+
+def _riemann_sum_fingerprint(G, phi, hc, depth, mult, K, prec, nedges=8):
+    r"""
+    Return data identifying the Riemann sum of ``phi`` against ``hc``: the
+    parameters of the sum together with the values of ``hc`` and of ``phi`` at
+    the first ``nedges`` edges of the covering.
+    """
+    values = []
+    for e in islice(G.iter_covering(depth), nedges):
+        hce = _hc_integer_value(hc(e))
+        te = sample_point(G, e, prec)
+        values.append((hce, None if te == Infinity else phi(K(te))))
+    return {"depth": depth, "mult": mult, "field": K, "values": values}
+
+
+def riemann_sum_streaming(
+    G,
+    phi,
+    hc,
+    depth=1,
+    mult=False,
+    progress_bar=False,
+    K=None,
+    checkpoint=None,
+    checkpoint_interval=10000,
+):
+    r"""
+    Riemann sum of ``phi`` against the harmonic cocycle ``hc``, generating the
+    edges of the covering of depth ``depth`` lazily, so that the memory used
+    does not depend on ``depth``.
+
+    If ``checkpoint`` is a filename, then the number of edges processed and the
+    partial sum are saved there every ``checkpoint_interval`` edges (and at the
+    end). The file is written at exactly this path, with no extension added.
+    If the file already exists and is not empty, the computation resumes from
+    it. The file also records the depth, ``mult``, ``K`` and the values of
+    ``hc`` and ``phi`` at the first few edges, and a ``ValueError`` is raised if
+    they do not match the current sum.
+
+    TESTS::
+
+        sage: from darmonpoints.sarithgroup import BigArithGroup
+        sage: from darmonpoints.integrals import riemann_sum_streaming
+        sage: G = BigArithGroup(11, 1, 1, use_shapiro=False, outfile='/dev/null')
+        sage: K = Qp(11, 10)
+        sage: phi = lambda x: x
+        sage: hc = lambda e: [1]
+        sage: full = riemann_sum_streaming(G, phi, hc, 2, K=K)
+        sage: fname = tmp_filename(ext='.ckpt')
+        sage: ncalls = [0]
+        sage: def hc_interrupted(e):
+        ....:     ncalls[0] += 1
+        ....:     if ncalls[0] == 60:
+        ....:         raise RuntimeError("interrupted")
+        ....:     return [1]
+        sage: riemann_sum_streaming(G, phi, hc_interrupted, 2, K=K, checkpoint=fname, checkpoint_interval=4)
+        Traceback (most recent call last):
+        ...
+        RuntimeError: interrupted
+        sage: import os
+        sage: os.path.getsize(fname) > 0
+        True
+        sage: ncalls = [0]
+        sage: def hc_counted(e):
+        ....:     ncalls[0] += 1
+        ....:     return [1]
+        sage: riemann_sum_streaming(G, phi, hc_counted, 2, K=K, checkpoint=fname, checkpoint_interval=4) == full
+        True
+        sage: ncalls[0] < G.covering_size(2)
+        True
+        sage: riemann_sum_streaming(G, lambda x: x**2, hc, 2, K=K, checkpoint=fname)
+        Traceback (most recent call last):
+        ...
+        ValueError: Checkpoint ... is for a different sum
+    """
+    prec = max([20, 2 * depth])
+    res = 1 if mult else 0
+    if K is None:
+        K = phi.parent().base_ring()
+    ncover = G.covering_size(depth)
+    n_done = 0
+    if checkpoint is not None:
+        fingerprint = _riemann_sum_fingerprint(G, phi, hc, depth, mult, K, prec)
+        try:
+            with open(checkpoint, "rb") as f:
+                data = f.read()
+        except (OSError, IOError):
+            data = None
+        data = loads(data) if data else None
+        if data is not None:
+            if any(data.get(k) != v for k, v in fingerprint.items()):
+                raise ValueError("Checkpoint %s is for a different sum" % checkpoint)
+            n_done, res = data["edges"], data["sum"]
+            verbose("Resuming from %s (%s edges done)" % (checkpoint, n_done))
+
+    def write_checkpoint(n_ints, res):
+        if checkpoint is not None:
+            data = dict(fingerprint)
+            data.update({"edges": n_ints, "sum": res})
+            with open(checkpoint, "wb") as f:
+                f.write(dumps(data))
+
+    n_ints = n_done
+    for e in islice(G.iter_covering(depth), n_done, None):
+        if n_ints % 500 == 499:
+            verbose("Done %s percent" % (100 * RealField(10)(n_ints) / ncover))
+        if progress_bar:
+            update_progress(float(RealField(10)(n_ints + 1) / ncover), "Riemann sum")
+        n_ints += 1
+        hce = _hc_integer_value(hc(e))
+        if hce != 0:
+            te = sample_point(G, e, prec)
+            if te != Infinity:
+                if mult:
+                    res *= phi(K(te)) ** hce
+                else:
+                    res += phi(K(te)) * hce
+        if n_ints % checkpoint_interval == 0:
+            write_checkpoint(n_ints, res)
+    write_checkpoint(n_ints, res)
+    return res
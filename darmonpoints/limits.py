@@ -1,3 +1,4 @@
+import heapq
 from itertools import chain, product, starmap
 from operator import itemgetter, mul
 
@@ -148,6 +149,32 @@ def num_evals(tau1, tau2):
     return p + 1 + (p - 1) * distance
 
 
+def schedule_by_cost(costs, nbins):
+    r"""
+    Distribute the tasks with the given ``costs`` into ``nbins`` bins, assigning
+    the most expensive remaining task to the least loaded bin (longest
+    processing time first).
+
+    Return the list of bins (lists of indices into ``costs``, most expensive
+    first) and the list of their total costs.
+
+    EXAMPLES::
+
+        sage: from darmonpoints.limits import schedule_by_cost
+        sage: schedule_by_cost([5, 1, 8, 3, 3], 2)
+        ([[2, 4], [0, 3, 1]], [11, 9])
+    """
+    bins = [[] for _ in range(nbins)]
+    loads = [0 for _ in range(nbins)]
+    heap = [(0, i) for i in range(nbins)]
+    for idx in sorted(range(len(costs)), key=lambda i: -costs[i]):
+        load, i = heapq.heappop(heap)
+        bins[i].append(idx)
+        loads[i] = load + costs[idx]
+        heapq.heappush(heap, (loads[i], i))
+    return bins, loads
+
+
 def compute_tau0(v0, gamma, wD, return_exact=False):
     r"""
     INPUT:
@@ -38,6 +38,8 @@ from sage.structure.richcmp import richcmp
 from sage.structure.sage_object import load, save
 from sage.structure.unique_representation import UniqueRepresentation
 
+from .util import LRUCache
+
 ##===========================================================================================
 
 
@@ -622,6 +624,9 @@ class BianchiDistributions(Module, UniqueRepresentation):
     - Chris Williams (2018-08-16)
     """
 
+    # Bound (in matrix entries) of the cache of acting matrices
+    default_cache_size = 2**22
+
     def __init__(self, p, depth, act_on_left=False, adjuster=None):
         self._dimension = (
             0  ## Hack!! Dimension was being called before it was intialised
@@ -633,7 +638,9 @@ class BianchiDistributions(Module, UniqueRepresentation):
         self._p = p
         self._depth = depth
         self._pN = self._p ** (depth - 1)
-        self._cache_powers = dict()
+        self._cache_powers = LRUCache(
+            self.default_cache_size, weight=lambda m: m.nrows() * m.ncols()
+        )
         self._unset_coercions_used()
 
         ## Initialise monoid Sigma_0(p) + action; use Pollack-Stevens modular symbol code
@@ -772,8 +779,22 @@ class BianchiDistributions(Module, UniqueRepresentation):
         return MatrixSpace(self._R, M, 1)
 
     def clear_cache(self):
-        del self._cache_powers
-        self._cache_powers = dict()
+        self._cache_powers.clear()
+
+    def set_cache_size(self, maxsize):
+        r"""
+        Bound the cache of acting matrices used by ``_get_powers`` to a total of
+        ``maxsize`` matrix entries (None means no bound). The least recently
+        used matrices are discarded first.
+        """
+        self._cache_powers.set_maxsize(maxsize)
+
+    def cache_info(self):
+        r"""
+        Return the hits, misses and evictions of the cache of acting matrices,
+        together with its current size and bound (in matrix entries).
+        """
+        return self._cache_powers.info()
 
     def is_overconvergent(self):
         return True
@@ -808,6 +829,52 @@ class BianchiDistributions(Module, UniqueRepresentation):
             first, second = emb0(g, M), emb1(g, M)
         return self._get_powers(self.Sigma0Squared()(first, second))
 
+    def act_many(self, g, mulist):
+        r"""
+        Return the list ``[mu * g for mu in mulist]``, where ``g`` is an element
+        of Sigma0Squared, computed with a single matrix product.
+
+        EXAMPLES::
+
+            sage: from darmonpoints.ocbianchi import BianchiDistributions
+            sage: D = BianchiDistributions(11,3)
+            sage: g = D.Sigma0Squared()([1,2,11,3],[1,3,0,4])
+            sage: mulist = [D.basis_vector((1,2)) + D.basis_vector((1,0)), D.basis_vector((0,1))]
+            sage: D.act_many(g, mulist) == [mu * g for mu in mulist]
+            True
+        """
+        mulist = list(mulist)
+        if len(mulist) == 0:
+            return []
+        A = self._get_powers(g)
+        X = Matrix(
+            ZZ, len(mulist), self._dimension, [mu._moments.list() for mu in mulist]
+        )
+        Y = (A * X.transpose()).change_ring(Zmod(self._pN)).change_ring(ZZ)
+        return [
+            BianchiDistributionElement(self, Y.matrix_from_columns([i]), check=False)
+            for i in range(len(mulist))
+        ]
+
+    def act_pairs(self, pairs):
+        r"""
+        Return the list ``[mu * g for g, mu in pairs]``. The pairs sharing the same
+        acting element are handled by a single call to :meth:`act_many`.
+        """
+        pairs = list(pairs)
+        groups = {}
+        for i, (g, mu) in enumerate(pairs):
+            key = (
+                tuple(g.first_element().matrix().list()),
+                tuple(g.second_element().matrix().list()),
+            )
+            groups.setdefault(key, (g, []))[1].append(i)
+        ans = [None for _ in pairs]
+        for g, idx in groups.values():
+            for i, nu in zip(idx, self.act_many(g, [pairs[i][1] for i in idx])):
+                ans[i] = nu
+        return ans
+
     def _get_powers(self, g, emb=None):
         r"""
         Auxiliary function to compute the Sigma_0(p)^2 action on moments.
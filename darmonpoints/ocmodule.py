@@ -40,6 +40,7 @@ from sage.structure.unique_representation import (
 from .homology import Divisors
 from .rationalfunctions import RationalFunctions
 from .representations import MatrixAction, Scaling
+from .util import LRUCache
 
 
 class our_adjuster(Sigma0ActionAdjuster):
@@ -79,13 +80,25 @@ class OCVnElement(ModuleElement):
      - ``parent`` - An overconvergent coefficient module.
 
      - ``val`` - The value that it needs to store (default: 0). It can be another OCVnElement,
-       in which case the values are copied. It can also be a column vector (or something
+       in which case the values are copied (truncating them or padding them with zeros if
+       the depths differ). It can also be a column vector (or something
        coercible to a column vector) which represents the values of the element applied to
        the polynomials `1`, `x`, `x^2`, ... ,`x^n`.
 
      - ``check`` - boolean (default: True). If set to False, no checks are done and ``val`` is
        assumed to be the a column vector.
 
+    EXAMPLES::
+
+        sage: from darmonpoints.ocmodule import OCVn
+        sage: V = OCVn(5, 3)
+        sage: W = OCVn(5, 5)
+        sage: v = V([1, 2, 3])
+        sage: W(v).moments()
+        [1, 2, 3, 0, 0]
+        sage: V(W(v)).moments()
+        [1, 2, 3]
+
     AUTHORS:
 
     - Cameron Franc (2012-02-20)
@@ -103,8 +116,11 @@ class OCVnElement(ModuleElement):
                 if val._parent._depth == parent._depth:
                     self._val = val._val
                 else:
+                    # Truncate or pad with zeros the moments of val
                     d = min([val._parent._depth, parent._depth])
-                    self._val = val._val.submatrix(0, 0, nrows=d)
+                    self._val = MatrixSpace(self._parent._R, self._depth, 1)(0)
+                    for i in range(d):
+                        self._val[i, 0] = ZZ(val._val[i, 0])
 
             elif isinstance(val, Vector_integer_dense) or isinstance(
                 val, FreeModuleElement_generic_dense
@@ -321,9 +337,22 @@ class OCVnElement(ModuleElement):
             return [self._val[ii, 0].valuation(l) for ii in range(self._depth)]
 
     def reduce_mod(self, N=None):
-        if N is None:
-            N = self.parent()._pN
+        r"""
+        Reduce the moments of ``self`` modulo ``N`` (by default `p^M`, in which
+        case there is nothing to do, since the moments live in `\ZZ/p^M\ZZ`).
+
+        EXAMPLES::
+
+            sage: from darmonpoints.ocmodule import OCVn
+            sage: V = OCVn(5, 3)
+            sage: v = V([1, 7, 24])
+            sage: v.reduce_mod() is v
+            True
+        """
+        if N is None or N == self._parent._pN:
+            return self
         self._val = self._val.apply_map(lambda x: x % N)
+        self._moments = self._val
         return self
 
 
@@ -351,6 +380,12 @@ class OCVn(Module, UniqueRepresentation):
 
     """
 
+    # Bound (in matrix entries) of the cache of acting matrices
+    default_cache_size = 2**22
+
+    # Method used to build acting matrices (see set_powers_method)
+    default_powers_method = "recurrence"
+
     def __init__(self, p, depth):
         Module.__init__(self, base=Zmod(p ** (depth - 1)))
         self._R = Zmod(p ** (depth - 1))
@@ -361,7 +396,10 @@ class OCVn(Module, UniqueRepresentation):
         self._PowerSeries = PowerSeriesRing(
             self._Rmod, default_prec=self._depth, name="z"
         )
-        self._cache_powers = dict()
+        self._cache_powers = LRUCache(
+            self.default_cache_size, weight=lambda m: m.nrows() * m.ncols()
+        )
+        self._powers_method = self.default_powers_method
         self._unset_coercions_used()
         self._Sigma0 = Sigma0(self._p, base_ring=self._Rmod, adjuster=our_adjuster())
         self.register_action(Sigma0Action(self._Sigma0, self))
@@ -376,8 +414,38 @@ class OCVn(Module, UniqueRepresentation):
         return MatrixSpace(self._R, M, 1)
 
     def clear_cache(self):
-        del self._cache_powers
-        self._cache_powers = dict()
+        self._cache_powers.clear()
+
+    def set_cache_size(self, maxsize):
+        r"""
+        Bound the cache of acting matrices used by ``_get_powers`` to a total of
+        ``maxsize`` matrix entries (None means no bound). The least recently
+        used matrices are discarded first.
+        """
+        self._cache_powers.set_maxsize(maxsize)
+
+    def cache_info(self):
+        r"""
+        Return the hits, misses and evictions of the cache of acting matrices,
+        together with its current size and bound (in matrix entries).
+        """
+        return self._cache_powers.info()
+
+    def set_powers_method(self, method):
+        r"""
+        Choose how acting matrices are computed. Both methods give the same
+        matrices.
+
+        - ``'recurrence'`` -- integer recurrence on the coefficients modulo `p^M`
+          (see :meth:`_get_powers_recurrence`).
+
+        - ``'power_series'`` -- multiplication of `p`-adic power series.
+        """
+        if method not in ("recurrence", "power_series"):
+            raise ValueError(
+                "method (= %s) should be 'recurrence' or 'power_series'" % method
+            )
+        self._powers_method = method
 
     def is_overconvergent(self):
         return True
@@ -406,17 +474,73 @@ class OCVn(Module, UniqueRepresentation):
             pass
         return self._get_powers(g).submatrix(0, 0, M, M)
 
+    def act_many(self, g, vlist):
+        r"""
+        Return the list ``[g * v for v in vlist]``, computed with a single matrix
+        product.
+
+        EXAMPLES::
+
+            sage: from darmonpoints.ocmodule import OCVn
+            sage: V = OCVn(5, 4)
+            sage: g = matrix(ZZ, 2, 2, [1, 5, 10, 3])
+            sage: vlist = [V([1, 2, 3, 4]), V([0, 1, 0, 25]), V(7)]
+            sage: V.act_many(g, vlist) == [v._acted_upon_(g, False) for v in vlist]
+            True
+        """
+        vlist = list(vlist)
+        if len(vlist) == 0:
+            return []
+        try:
+            g = g.matrix()
+        except AttributeError:
+            pass
+        A = self._get_powers(g).change_ring(self._R)
+        X = Matrix(self._R, len(vlist), self._depth, [v._val.list() for v in vlist])
+        Y = A * X.transpose()
+        return [
+            OCVnElement(self, Y.matrix_from_columns([i]), check=False)
+            for i in range(len(vlist))
+        ]
+
+    def act_pairs(self, pairs):
+        r"""
+        Return the list ``[g * v for g, v in pairs]``. The pairs sharing the same
+        acting element are handled by a single call to :meth:`act_many`.
+        """
+        pairs = list(pairs)
+        groups = {}
+        for i, (g, v) in enumerate(pairs):
+            try:
+                key = tuple(g.matrix().list())
+            except AttributeError:
+                key = tuple(g.list())
+            groups.setdefault(key, (g, []))[1].append(i)
+        ans = [None for _ in pairs]
+        for g, idx in groups.values():
+            for i, w in zip(idx, self.act_many(g, [pairs[i][1] for i in idx])):
+                ans[i] = w
+        return ans
+
     def _get_powers(self, abcd, emb=None):
         abcd = tuple(abcd.list())
         try:
             return self._cache_powers[abcd]
         except KeyError:
             pass
-        R = self._PowerSeries
         if emb is None:
             a, b, c, d = abcd
         else:
             a, b, c, d = emb(abcd).list()
+        if self._powers_method == "recurrence":
+            x = self._get_powers_recurrence(a, b, c, d)
+        else:
+            x = self._get_powers_power_series(a, b, c, d)
+        self._cache_powers[abcd] = x
+        return x
+
+    def _get_powers_power_series(self, a, b, c, d):
+        R = self._PowerSeries
         r = R([b, a])
         s = R([d, c])
         ratio = r * s**-1
@@ -429,9 +553,47 @@ class OCVn(Module, UniqueRepresentation):
                 [R.base_ring().zero() for o in range(self._depth - len(ylist))]
             )
             xlist.append([ZZ(o) for o in ylist])
-        x = Matrix(ZZ, self._depth, self._depth, xlist)
-        self._cache_powers[abcd] = x
-        return x
+        return Matrix(ZZ, self._depth, self._depth, xlist)
+
+    def _get_powers_recurrence(self, a, b, c, d):
+        r"""
+        Return the matrix whose `i`-th row contains the coefficients of
+        `((b+az)/(d+cz))^i` modulo `p^M` and `z^M`, where `M` is the depth.
+
+        Writing `y_i = ((b+az)/(d+cz))^i`, the identity `(d+cz) y_i = (b+az) y_{i-1}`
+        determines each row from the previous one using only integer arithmetic
+        modulo `p^M`. This takes `O(M^2)` products of Python integers of the size
+        of `p^M`, with no `p`-adic element or power series created, and each
+        matrix is computed once and then cached (see :meth:`set_cache_size`).
+        Running the loop on FLINT's ``nmod_mat`` or ``fmpz_mod_mat`` would need a
+        Cython extension that links against FLINT. The extensions of this
+        package (``sparse.pyx`` and ``mixed_extension.pyx``) are plain Cython,
+        and ``setup.py`` does not declare that dependency.
+
+        EXAMPLES::
+
+            sage: from darmonpoints.ocmodule import OCVn
+            sage: V = OCVn(5, 10)
+            sage: V._get_powers_recurrence(1, 5, 10, 3) == V._get_powers_power_series(1, 5, 10, 3)
+            True
+        """
+        M = self._depth
+        N = int(self._pN)
+        a, b, c, d = (int(ZZ(self._Rmod(o))) % N for o in (a, b, c, d))
+        dinv = pow(d, -1, N)
+        prev = [1] + [0 for _ in range(M - 1)]
+        xlist = list(prev)
+        for i in range(1, M):
+            row = []
+            last = 0
+            prev_last = 0
+            for k in range(M):
+                last = (dinv * (b * prev[k] + a * prev_last - c * last)) % N
+                prev_last = prev[k]
+                row.append(last)
+            xlist.extend(row)
+            prev = row
+        return Matrix(ZZ, M, M, xlist)
 
     def _repr_(self):
         r"""
@@ -212,6 +212,9 @@ class BigArithGroup_class(AlgebraicGroup):
         846 - 429*i + 286*j + 286*k
     """
 
+    # precision of the local embeddings used by reduce_in_amalgam
+    amalgam_prec = 10
+
     def __init__(
         self,
         base,
@@ -631,6 +634,48 @@ class BigArithGroup_class(AlgebraicGroup):
             [BTEdge(False, o) for o in self.get_BT_reps_twisted()], 1, depth - 1
         )
 
+    def iter_covering(self, depth):
+        r"""
+        Iterate over the edges of ``self.get_covering(depth)``, in the same order,
+        without building the whole list.
+
+        EXAMPLES::
+
+            sage: from darmonpoints.sarithgroup import BigArithGroup
+            sage: G = BigArithGroup(11, 1, 1, use_shapiro=False, outfile='/dev/null')
+            sage: list(G.iter_covering(2)) == G.get_covering(2)
+            True
+            sage: G.covering_size(2) == len(G.get_covering(2))
+            True
+        """
+        return self._iter_subdivide(
+            [BTEdge(False, o) for o in self.get_BT_reps_twisted()], 1, depth - 1
+        )
+
+    def covering_size(self, depth):
+        r"""
+        Return the number of edges in ``self.get_covering(depth)``.
+        """
+        if depth < 1:
+            return 0
+        return len(self.get_BT_reps_twisted()) * self.p ** (depth - 1)
+
+    def _iter_subdivide(self, edgelist, parity, depth):
+        if depth < 0:
+            return
+        for rev, gamma in edgelist:
+            if depth == 0:
+                set_immutable(gamma)
+                yield BTEdge(rev, gamma)
+                continue
+            if parity % 2 == 0:
+                reps = self.get_BT_reps_twisted()[1:]
+            else:
+                reps = self.get_BT_reps()[1:]
+            yield from self._iter_subdivide(
+                [BTEdge(not rev, e * gamma) for e in reps], 1 - parity, depth - 1
+            )
+
     def get_Zp_covering(self, depth):
         return self.subdivide(
             [BTEdge(False, o) for o in self.get_BT_reps_twisted()[1:]], 1, depth - 1
@@ -803,12 +848,17 @@ class BigArithGroup_class(AlgebraicGroup):
             [o**-1 for o in self.get_BT_reps_twisted()],
         ]
 
-    def reduce_in_amalgam(self, x, return_word=False, check=False):
+    def reduce_in_amalgam(self, x, return_word=False, check=False, xl=None):
+        r"""
+        Reduce ``x`` in the amalgam. If ``return_word`` is False, then ``xl`` may
+        be the embedding ``self.embed(x, self.amalgam_prec)``, which then is not
+        recomputed.
+        """
         if return_word:
             a, wd = self._reduce_in_amalgam(set_immutable(x))
         else:
             try:
-                a = self._reduce_fast(set_immutable(x))
+                a = self._reduce_fast(set_immutable(x), xl)
             except RecursionError:
                 raise RuntimeError("Error in reduce_in_amalgam: %s" % x)
         if check:
@@ -839,7 +889,7 @@ class BigArithGroup_class(AlgebraicGroup):
 
     def _reduce_fast(self, x, xl=None):
         p = self.p
-        prec = 10
+        prec = self.amalgam_prec
         if xl is None:
             xl = self.embed(x, prec)
         dval = lambda y, z: -min([o.valuation(p) for o in (y * z).list()])
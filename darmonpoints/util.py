@@ -1,6 +1,7 @@
 import configparser
 import sys
 import types
+from collections import OrderedDict
 from functools import reduce
 from itertools import chain, groupby, islice, product, starmap, tee
 
@@ -14,7 +15,7 @@ from sage.functions.transcendental import Function_zeta
 from sage.groups.finitely_presented import wrap_FpGroup
 from sage.interfaces.gp import gp
 from sage.libs.pari.all import PariError, pari
-from sage.matrix.all import Matrix, matrix
+from sage.matrix.all import Matrix, block_matrix, matrix
 from sage.misc.all import cached_method, cartesian_product_iterator
 from sage.misc.cachefunc import cached_function
 from sage.misc.functional import cyclotomic_polynomial
@@ -24,6 +25,9 @@ from sage.misc.sage_eval import sage_eval
 from sage.misc.verbose import get_verbose, set_verbose, verbose
 from sage.modular.modform.constructor import CuspForms, EisensteinForms
 from sage.modules.fg_pid.fgp_module import FGP_Module, FGP_Module_class
+from sage.modules.free_module_element import vector
+from sage.parallel.decorate import parallel
+from sage.parallel.ncpus import ncpus as available_ncpus
 from sage.rings.all import CC, QQ, RR, ZZ, Qp, RealField
 from sage.rings.big_oh import O
 from sage.rings.fast_arith import prime_range
@@ -2198,6 +2202,50 @@ def update_progress(progress, msg=""):
     sys.stdout.flush()
 
 
+def parallel_map(f, inputs, ncpus=None, chunksize=None, progress_bar=False, msg=""):
+    r"""
+    Return the list ``[f(x) for x in inputs]``, computed by a pool of ``ncpus``
+    forked processes.
+
+    The inputs are split into chunks of ``chunksize`` consecutive elements (by
+    default, about four chunks per process), and each chunk is evaluated in a
+    single process. Since the workers are forked, ``f`` may be a closure, but
+    its return values need to be picklable.
+
+    EXAMPLES::
+
+        sage: from darmonpoints.util import parallel_map
+        sage: parallel_map(lambda x: x**2, range(10), ncpus=2)
+        [0, 1, 4, 9, 16, 25, 36, 49, 64, 81]
+    """
+    inputs = list(inputs)
+    if ncpus is None:
+        ncpus = available_ncpus()
+    if ncpus == 1 or len(inputs) <= 1:
+        return [f(x) for x in inputs]
+    if chunksize is None:
+        chunksize = max(1, -(-len(inputs) // (4 * ncpus)))
+    chunks = [(i, inputs[i : i + chunksize]) for i in range(0, len(inputs), chunksize)]
+
+    @parallel(ncpus=ncpus)
+    def parallel_map_aux(i, chunk):
+        return i, [f(x) for x in chunk]
+
+    ans = [None for x in inputs]
+    done = 0
+    for _, outp in parallel_map_aux(chunks):
+        if isinstance(outp, str):
+            raise RuntimeError("A worker process failed (%s)" % outp)
+        i, vals = outp
+        ans[i : i + len(vals)] = vals
+        done += len(vals)
+        if progress_bar:
+            update_progress(float(done) / float(len(inputs)), msg)
+        else:
+            verbose("%s: done %s/%s" % (msg, done, len(inputs)))
+    return ans
+
+
 def selmer_group_iterator(self, S, m, proof=True):
     r"""
     Return an iterator through elements of the finite group `K(S,m)`.
@@ -2314,6 +2362,515 @@ class Bunch:
             return default
 
 
+class BlockSparseMatrix:
+    r"""
+    A square matrix over `\ZZ/N\ZZ`, made of ``nblocks`` by ``nblocks`` square
+    blocks of size ``dim``, of which only the nonzero ones are stored.
+
+    If `N` is small enough for the native modular matrices of Sage, the blocks
+    are matrices over `\ZZ/N\ZZ`. Otherwise they are integer matrices (backed
+    by FLINT) which are reduced modulo `N` after each product, instead of
+    generic matrices of Python objects.
+
+    It can be multiplied by vectors of length ``nblocks * dim`` over `\ZZ/N\ZZ`
+    (the cost is proportional to the number of nonzero blocks) and by other
+    block sparse matrices.
+
+    EXAMPLES::
+
+        sage: from darmonpoints.util import BlockSparseMatrix
+        sage: for N in [5^3, 5^30]:
+        ....:     A = random_matrix(Zmod(N), 6, 6)
+        ....:     B = BlockSparseMatrix(N, 3, 2)
+        ....:     for j, i in [(0, 0), (0, 2), (1, 1), (2, 0)]:
+        ....:         B.add_to_block(j, i, A.submatrix(2 * j, 2 * i, 2, 2))
+        ....:     D = B.matrix()
+        ....:     v = random_vector(Zmod(N), 6)
+        ....:     print((B.nonzero_blocks(), B * v == D * v, (B * B).matrix() == D * D))
+        (4, True, True)
+        (4, True, True)
+    """
+
+    # Largest modulus for which the blocks are stored over Zmod(N)
+    native_modulus_bound = 2**23
+
+    def __init__(self, N, nblocks, dim):
+        self._N = ZZ(N)
+        self._R = Zmod(self._N)
+        self._W = self._R if self._N < self.native_modulus_bound else ZZ
+        self._nblocks = nblocks
+        self._dim = dim
+        self._blocks = {}
+
+    def _to_working(self, A):
+        A = A.change_ring(self._R)
+        return A if self._W is self._R else A.lift()
+
+    def add_to_block(self, j, i, A):
+        r"""
+        Add the matrix ``A`` to the block in position ``(j, i)``.
+        """
+        A = self._to_working(A)
+        if (j, i) in self._blocks:
+            A = self._to_working(self._blocks[(j, i)] + A)
+        if A == 0:
+            self._blocks.pop((j, i), None)
+        else:
+            self._blocks[(j, i)] = A
+
+    def nonzero_blocks(self):
+        r"""
+        Return the number of nonzero blocks.
+        """
+        return len(self._blocks)
+
+    def matrix(self):
+        r"""
+        Return ``self`` as a dense matrix over `\ZZ/N\ZZ`.
+        """
+        zero = matrix(self._R, self._dim, self._dim, 0)
+        return block_matrix(
+            self._R,
+            [
+                [
+                    self._blocks[(j, i)].change_ring(self._R)
+                    if (j, i) in self._blocks
+                    else zero
+                    for i in range(self._nblocks)
+                ]
+                for j in range(self._nblocks)
+            ],
+            subdivide=False,
+        )
+
+    def __mul__(self, other):
+        dim = self._dim
+        if isinstance(other, BlockSparseMatrix):
+            by_row = {}
+            for (i, k), B in other._blocks.items():
+                by_row.setdefault(i, []).append((k, B))
+            ans = BlockSparseMatrix(self._N, self._nblocks, dim)
+            for (j, i), A in self._blocks.items():
+                for k, B in by_row.get(i, []):
+                    ans.add_to_block(j, k, A * B)
+            return ans
+        X = list(other)
+        xs = [
+            vector(self._W, [self._W(ZZ(o)) for o in X[i * dim : (i + 1) * dim]])
+            for i in range(self._nblocks)
+        ]
+        ys = [vector(self._W, dim) for _ in range(self._nblocks)]
+        for (j, i), A in self._blocks.items():
+            ys[j] += A * xs[i]
+        return vector(self._R, sum([y.list() for y in ys], []))
+
+
+class LRUCache:
+    r"""
+    A dictionary-like cache which keeps at most ``maxsize`` units, discarding
+    the least recently used entries first.
+
+    Each value counts as ``weight(value)`` units (one unit if ``weight`` is
+    None), so the cache can be bounded either by number of entries or by an
+    estimate of the memory used. If ``maxsize`` is None the cache is unbounded.
+    The number of hits, misses and evictions is recorded (see :meth:`info`).
+
+    EXAMPLES::
+
+        sage: from darmonpoints.util import LRUCache
+        sage: C = LRUCache(2)
+        sage: C[1] = 'a'; C[2] = 'b'
+        sage: C[1]
+        'a'
+        sage: C[3] = 'c'
+        sage: 2 in C, 1 in C, 3 in C
+        (False, True, True)
+        sage: C[2]
+        Traceback (most recent call last):
+        ...
+        KeyError: 2
+        sage: C.info()
+        {'hits': 1, 'misses': 1, 'evictions': 1, 'size': 2, 'maxsize': 2}
+    """
+
+    def __init__(self, maxsize=None, weight=None):
+        self._data = OrderedDict()
+        self._maxsize = maxsize
+        self._weight = weight
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _item_weight(self, value):
+        return 1 if self._weight is None else self._weight(value)
+
+    def __getitem__(self, key):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            raise
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self._data:
+            self._size -= self._item_weight(self._data.pop(key))
+        self._data[key] = value
+        self._size += self._item_weight(value)
+        self._evict()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def _evict(self):
+        if self._maxsize is None:
+            return
+        while self._size > self._maxsize and len(self._data) > 1:
+            _, value = self._data.popitem(last=False)
+            self._size -= self._item_weight(value)
+            self.evictions += 1
+
+    def set_maxsize(self, maxsize):
+        r"""
+        Change the bound of the cache, evicting entries if needed.
+        """
+        self._maxsize = maxsize
+        self._evict()
+
+    def clear(self):
+        r"""
+        Empty the cache. The statistics are kept.
+        """
+        self._data.clear()
+        self._size = 0
+
+    def info(self):
+        r"""
+        Return a dictionary with the statistics of the cache.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": self._size,
+            "maxsize": self._maxsize,
+        }
+
+
+def cached_power(cache, key, x, n, one, red=None):
+    r"""
+    Return ``x**n`` for ``n >= 0``, computed by repeated squaring.
+
+    The intermediate powers are stored in (and looked up from) ``cache`` under
+    the keys ``(key, red, k)``, so that powers of the same ``x`` share the
+    work. The reduction map ``red`` is part of the key (it is compared by
+    identity), so pass None rather than a new identity function each time.
+
+    EXAMPLES::
+
+        sage: from darmonpoints.util import cached_power
+        sage: cache = {}
+        sage: cached_power(cache, 0, 3, 5, 1)
+        243
+        sage: sorted(cache)
+        [(0, None, 2), (0, None, 5)]
+        sage: red = lambda x: x % 7
+        sage: cached_power(cache, 0, 3, 5, 1, red)
+        5
+    """
+    if n == 0:
+        return one
+    if n == 1:
+        return x
+    try:
+        return cache[(key, red, n)]
+    except KeyError:
+        pass
+    h = cached_power(cache, key, x, n // 2, one, red)
+    ans = h * h
+    if red is not None:
+        ans = red(ans)
+    if n % 2 == 1:
+        ans = ans * x
+        if red is not None:
+            ans = red(ans)
+    cache[(key, red, n)] = ans
+    return ans
+
+
+def cached_geometric_sum(cache, key, x, n, one, red=None):
+    r"""
+    Return ``1 + x + ... + x**(n-1)`` for ``n >= 1``, using `O(\log n)`
+    products by the doubling formula `S_{2m} = (1 + x^m) S_m`.
+
+    The partial sums and powers are stored in ``cache``, see
+    :func:`cached_power`.
+
+    EXAMPLES::
+
+        sage: from darmonpoints.util import cached_geometric_sum
+        sage: cached_geometric_sum({}, 0, 3, 4, 1)
+        40
+        sage: cached_geometric_sum({}, 0, 2, 7, 1)
+        127
+    """
+    if n == 1:
+        return one
+    try:
+        return cache[(key, red, "sum", n)]
+    except KeyError:
+        pass
+    m = n // 2
+    S = cached_geometric_sum(cache, key, x, m, one, red)
+    ans = S + cached_power(cache, key, x, m, one, red) * S
+    if red is not None:
+        ans = red(ans)
+    if n % 2 == 1:
+        ans = ans + cached_power(cache, key, x, n - 1, one, red)
+        if red is not None:
+            ans = red(ans)
+    cache[(key, red, "sum", n)] = ans
+    return ans
+
+
+def sparse_right_kernel_matrix(R, nrows, ncols, entries, algorithm="default"):
+    r"""
+    Return a matrix whose rows are a basis of the right kernel of the
+    ``nrows`` by ``ncols`` matrix over ``R`` whose nonzero entries are given by
+    the dictionary ``entries``, mapping ``(i, j)`` to the entry.
+
+    The ``algorithm`` can be:
+
+    - ``'dense'`` -- assemble a dense matrix and use the default kernel
+      algorithm of ``R``.
+
+    - ``'sparse'`` -- assemble a sparse matrix and compute its kernel.
+
+    - ``'modular'`` -- only for ``R`` equal to ``ZZ`` or ``QQ``. Clear the
+      denominators and compute the kernel over ``ZZ`` by `p`-adic lifting,
+      which works modulo primes and recovers the kernel by rational
+      reconstruction.
+
+    - ``'default'`` -- ``'modular'`` over ``ZZ`` and ``QQ``, ``'sparse'``
+      over other fields and ``'dense'`` otherwise.
+
+    EXAMPLES::
+
+        sage: from darmonpoints.util import sparse_right_kernel_matrix
+        sage: entries = {(0, 0): 1, (0, 1): 2, (1, 2): 3}
+        sage: K = sparse_right_kernel_matrix(ZZ, 2, 3, entries, algorithm='modular')
+        sage: K.rank(), all(v[0] + 2 * v[1] == 0 and v[2] == 0 for v in K.rows())
+        (1, True)
+        sage: K.row_module() == sparse_right_kernel_matrix(ZZ, 2, 3, entries, algorithm='dense').row_module()
+        True
+        sage: sparse_right_kernel_matrix(GF(5), 2, 3, entries).rank()
+        1
+    """
+    if algorithm == "default":
+        if R is ZZ or R is QQ:
+            algorithm = "modular"
+        elif R.is_field():
+            algorithm = "sparse"
+        else:
+            algorithm = "dense"
+    if algorithm not in ("dense", "sparse", "modular"):
+        raise ValueError(
+            "algorithm (= %s) should be 'dense', 'sparse' or 'modular'" % algorithm
+        )
+    entries = {ij: a for ij, a in entries.items() if a != 0}
+    if nrows == 0 or len(entries) == 0:
+        return matrix(R, ncols, ncols, 1)
+    if algorithm == "modular":
+        if R is not ZZ and R is not QQ:
+            raise ValueError("The modular algorithm needs R to be ZZ or QQ")
+        den = lcm([QQ(a).denominator() for a in entries.values()])
+        A = matrix(ZZ, nrows, ncols, {ij: ZZ(den * a) for ij, a in entries.items()})
+        return A.right_kernel_matrix(algorithm="padic").change_ring(R)
+    A = matrix(R, nrows, ncols, entries, sparse=(algorithm == "sparse"))
+    return A.right_kernel_matrix()
+
+
+class FoxGradientProgram:
+    r"""
+    Straight-line programs computing Fox gradients of words in the image of a
+    representation of a free group.
+
+    A word `w = x_{i_1}^{a_1} \cdots x_{i_n}^{a_n}` (given as a list of
+    syllables ``(i, a)``, see :func:`tietze_to_syllables`) is compiled into the
+    list of triples ``(k, i_j, a_j)``, where ``k`` indexes the prefix
+    `h_{j-1} = x_{i_1}^{a_1} \cdots x_{i_{j-1}}^{a_{j-1}}`. The `i`-th entry of
+    the gradient is then the sum of `h_{j-1} \cdot F(i_j, a_j)` over the
+    syllables with `i_j = i`, where `F(i, a) = (x_i^a - 1) / (x_i - 1)`.
+
+    The prefixes are numbered once and shared by all the compiled words, and
+    their images are kept in a bounded cache, so common subproducts are only
+    computed once. Each prefix is identified by its parent prefix and its last
+    syllable, so compiling a word of `n` syllables takes `O(n)` time. When more
+    than ``max_prefixes`` prefixes have been numbered, the table of prefixes
+    is flushed, and the compiled programs are kept in a bounded cache too.
+    The images of `x_i^a` and of `F(i, a)` are given by the functions
+    ``gen_pow(i, a)`` and ``fox_term(i, a)``.
+
+    If ``twisted`` is True, the products are taken in the opposite order and
+    the prefixes are built from ``gen_pow(i, -a)``, as needed for the twisted
+    gradient of homology.
+
+    EXAMPLES::
+
+        sage: from darmonpoints.util import FoxGradientProgram
+        sage: gens = [2, 3]
+        sage: F = FoxGradientProgram(lambda i, a: gens[i]**a, lambda i, a: sum(gens[i]**k for k in range(a)))
+        sage: F.gradient([(0, 2), (1, 1)], 0)
+        [3, 4]
+        sage: F.gradient([(0, 2), (1, 2)], 0)
+        [3, 16]
+        sage: F.compile([(0, 2), (1, 2)])
+        ((0, 0, 2), (1, 1, 2))
+        sage: F.compile([(0, 2), (1, 2), (0, 1)])
+        ((0, 0, 2), (1, 1, 2), (2, 0, 1))
+
+    The table of prefixes is bounded::
+
+        sage: F = FoxGradientProgram(lambda i, a: gens[i]**a, lambda i, a: sum(gens[i]**k for k in range(a)), max_prefixes=4)
+        sage: [F.gradient([(0, k), (1, 1)], 0) for k in range(1, 7)]
+        [[1, 2], [3, 4], [7, 8], [15, 16], [31, 32], [63, 64]]
+        sage: F.num_prefixes()
+        3
+    """
+
+    default_cache_size = 2**12
+    default_max_prefixes = 2**16
+    default_program_cache_size = 2**12
+
+    def __init__(
+        self,
+        gen_pow,
+        fox_term,
+        twisted=False,
+        red=None,
+        cache_size=None,
+        max_prefixes=None,
+        program_cache_size=None,
+    ):
+        self._gen_pow = gen_pow
+        self._fox_term = fox_term
+        self._twisted = twisted
+        self._red = (lambda x: x) if red is None else red
+        if cache_size is None:
+            cache_size = self.default_cache_size
+        if max_prefixes is None:
+            max_prefixes = self.default_max_prefixes
+        if program_cache_size is None:
+            program_cache_size = self.default_program_cache_size
+        self._max_prefixes = max_prefixes
+        # Prefix k is obtained from prefix _prefix_ops[k][0] by one syllable
+        self._prefix_index = {}
+        self._prefix_ops = [None]
+        self._programs = LRUCache(program_cache_size)
+        self._one = gen_pow(0, 0)
+        self._values = LRUCache(cache_size)
+
+    def clear(self):
+        r"""
+        Forget all the prefixes, programs and prefix images.
+        """
+        self._prefix_index = {}
+        self._prefix_ops = [None]
+        self._programs.clear()
+        self._values.clear()
+
+    def num_prefixes(self):
+        r"""
+        Return the number of prefixes currently numbered (including the empty
+        one).
+        """
+        return len(self._prefix_ops)
+
+    def compile(self, syllables):
+        r"""
+        Return the program computing the Fox gradient of the word given by the
+        list of ``syllables``.
+        """
+        syllables = tuple(syllables)
+        try:
+            return self._programs[syllables]
+        except KeyError:
+            pass
+        if len(self._prefix_ops) + len(syllables) > self._max_prefixes:
+            self.clear()
+        program = []
+        k = 0
+        for j, (i, a) in enumerate(syllables):
+            program.append((k, i, a))
+            if j < len(syllables) - 1:
+                key = (k, i, a)
+                try:
+                    k = self._prefix_index[key]
+                except KeyError:
+                    self._prefix_ops.append(key)
+                    k = self._prefix_index[key] = len(self._prefix_ops) - 1
+        program = tuple(program)
+        self._programs[syllables] = program
+        return program
+
+    def prefix_value(self, k):
+        r"""
+        Return the image of the ``k``-th prefix.
+        """
+        if k == 0:
+            return self._one
+        # Walk up to the nearest prefix whose image is known
+        path = []
+        while k != 0 and k not in self._values:
+            path.append(k)
+            k = self._prefix_ops[k][0]
+        h = self._one if k == 0 else self._values[k]
+        for k in reversed(path):
+            _, i, a = self._prefix_ops[k]
+            if self._twisted:
+                h = self._red(self._gen_pow(i, -a) * h)
+            else:
+                h = self._red(h * self._gen_pow(i, a))
+            self._values[k] = h
+        return h
+
+    def gradient(self, syllables, zero, ngens=None):
+        r"""
+        Return the list of the entries of the Fox gradient of the word given by
+        the list of ``syllables``. Generators which do not appear in the word
+        get ``zero``, and the list has at least ``ngens`` entries.
+        """
+        program = self.compile(syllables)
+        if ngens is None:
+            ngens = 1 + max((i for _, i, _ in program), default=-1)
+        ans = [zero for _ in range(ngens)]
+        for k, i, a in program:
+            h = self.prefix_value(k)
+            if self._twisted:
+                ans[i] = self._red(ans[i] + self._fox_term(i, a) * h)
+            else:
+                ans[i] = self._red(ans[i] + h * self._fox_term(i, a))
+        return ans
+
+    def set_cache_size(self, cache_size):
+        r"""
+        Change the number of prefix images kept in the cache.
+        """
+        self._values.set_maxsize(cache_size)
+
+    def cache_info(self):
+        r"""
+        Return the statistics of the cache of prefix images.
+        """
+        return self._values.info()
+
+
 def config_section_map(config, section):
     dict1 = {}
     try: